@@ -46,11 +46,11 @@ class AgentAPIInterface:
             waste_alerts, waste_solutions = self.agent.analyze_food_waste(data['food_waste'])
             all_alerts.extend(waste_alerts)
             all_solutions.extend(waste_solutions)
-            total_waste_cost = sum(w.cost_impact for w in data['food_waste'])
+            total_waste_cost = data['food_waste']['total_cost']
             category_insights['food_waste'] = {
                 'alerts_count': len(waste_alerts),
                 'total_cost_impact': round(total_waste_cost, 2),
-                'waste_records': len(data['food_waste'])
+                'waste_records': data['food_waste']['records']
             }
 
             # Weather Analysis
@@ -79,10 +79,10 @@ class AgentAPIInterface:
             sales_alerts, sales_solutions = self.agent.analyze_sales_trends(data['sales_trends'])
             all_alerts.extend(sales_alerts)
             all_solutions.extend(sales_solutions)
-            total_revenue = sum(s.total_amount for s in data['sales'])
+            total_revenue = data['sales']['revenue']
             category_insights['sales'] = {
                 'alerts_count': len(sales_alerts),
-                'recent_sales': len(data['sales']),
+                'recent_sales': data['sales']['transactions'],
                 'total_revenue': round(total_revenue, 2)
             }
 
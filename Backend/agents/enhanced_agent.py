@@ -14,14 +14,99 @@ import random
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from sqlalchemy import func
+
 from database import (
-    SessionLocal, InventoryItem, IntelligenceSignal, Recommendation,
-    FoodWaste, Weather, Event, Sale, Order
+    SessionLocal, SnapshotSessionLocal, InventoryItem, IntelligenceSignal,
+    Weather, Event, Order, DailySalesRollup, WasteDailyTotal
 )
 from models import (
     Priority, RecommendationCategory, WasteReason, WeatherCondition,
     EventType, CustomerType, OrderStatus
 )
+from recommendation_store import upsert_recommendations
+from analytics_snapshot import current_group_totals
+
+def aggregate_sales(db, since: date) -> Dict:
+    """Per-item, per-time-of-day and per-customer-type sales totals since a date
+
+    Read from the columnar analytics snapshot plus newer sales when it is built,
+    otherwise from the daily rollup.
+    """
+    rows = current_group_totals(db, "sales", ["item", "time_of_day", "customer_type"], since)
+    if rows is None:
+        rows = db.query(
+            DailySalesRollup.item_id,
+            DailySalesRollup.time_of_day,
+            DailySalesRollup.customer_type,
+            func.sum(DailySalesRollup.transactions),
+            func.sum(DailySalesRollup.quantity),
+            func.sum(DailySalesRollup.revenue)
+        ).filter(
+            DailySalesRollup.sale_date >= since
+        ).group_by(DailySalesRollup.item_id, DailySalesRollup.time_of_day, DailySalesRollup.customer_type).all()
+
+    by_item = {}
+    by_time_of_day = {}
+    by_customer_type = {}
+    for item_id, time_of_day, customer_type, transactions, quantity, revenue in rows:
+        for totals in (
+            by_item.setdefault(item_id, {"transactions": 0, "quantity": 0.0, "revenue": 0.0}),
+            by_time_of_day.setdefault(time_of_day, {"transactions": 0, "quantity": 0.0, "revenue": 0.0}),
+            by_customer_type.setdefault(customer_type, {"transactions": 0, "quantity": 0.0, "revenue": 0.0})
+        ):
+            totals["transactions"] += transactions or 0
+            totals["quantity"] += quantity or 0.0
+            totals["revenue"] += revenue or 0.0
+
+    def by_revenue(totals: Dict) -> Dict:
+        return dict(sorted(totals.items(), key=lambda x: x[1]["revenue"], reverse=True))
+
+    return {
+        "transactions": sum(totals["transactions"] for totals in by_item.values()),
+        "quantity": sum(totals["quantity"] for totals in by_item.values()),
+        "revenue": sum(totals["revenue"] for totals in by_item.values()),
+        "by_item": by_revenue(by_item),  # highest revenue first
+        "by_time_of_day": by_revenue(by_time_of_day),
+        "by_customer_type": by_revenue(by_customer_type)
+    }
+
+def aggregate_food_waste(db, since: date) -> Dict:
+    """Per-item and per-reason waste totals since a date
+
+    Read from the columnar analytics snapshot plus newer waste records when it is
+    built, otherwise from the running daily totals.
+    """
+    rows = current_group_totals(db, "food_waste", ["item", "reason"], since)
+    if rows is None:
+        rows = db.query(
+            WasteDailyTotal.item_id,
+            WasteDailyTotal.reason,
+            func.sum(WasteDailyTotal.records),
+            func.sum(WasteDailyTotal.quantity),
+            func.sum(WasteDailyTotal.cost)
+        ).filter(
+            WasteDailyTotal.waste_date >= since
+        ).group_by(WasteDailyTotal.item_id, WasteDailyTotal.reason).all()
+
+    by_item = {}
+    by_reason = {}
+    for item_id, reason, records, quantity, cost in rows:
+        item_totals = by_item.setdefault(item_id, {"records": 0, "quantity": 0.0, "cost": 0.0})
+        item_totals["records"] += records or 0
+        item_totals["quantity"] += quantity or 0.0
+        item_totals["cost"] += cost or 0.0
+
+        reason_totals = by_reason.setdefault(reason, {"records": 0, "cost": 0.0})
+        reason_totals["records"] += records or 0
+        reason_totals["cost"] += cost or 0.0
+
+    return {
+        "records": sum(totals["records"] for totals in by_item.values()),
+        "total_cost": sum(totals["cost"] for totals in by_item.values()),
+        "by_item": dict(sorted(by_item.items(), key=lambda x: x[1]["cost"], reverse=True)),  # costliest first
+        "by_reason": by_reason
+    }
 
 class EnhancedKopikAgent:
     """Enhanced intelligence agent with comprehensive data analysis"""
@@ -33,8 +118,12 @@ class EnhancedKopikAgent:
         print("🤖 Enhanced Kopik Intelligence Agent initialized")
 
     def fetch_comprehensive_data(self):
-        """Fetch all types of data for comprehensive analysis"""
-        db = SessionLocal()
+        """Fetch all types of data for comprehensive analysis
+
+        Every query reads the same snapshot on the read-only analysis engine, so the
+        sections agree with each other while writes keep arriving.
+        """
+        db = SnapshotSessionLocal()
         try:
             today = date.today()
             week_ago = today - timedelta(days=7)
@@ -49,10 +138,8 @@ class EnhancedKopikAgent:
                 IntelligenceSignal.created_at.desc()
             ).limit(50).all()
 
-            # New data sources
-            recent_waste = db.query(FoodWaste).filter(
-                FoodWaste.waste_date >= week_ago
-            ).all()
+            # New data sources (waste and sales come from the analytics snapshot or the running totals, never row by row)
+            recent_waste = aggregate_food_waste(db, week_ago)
 
             recent_weather = db.query(Weather).filter(
                 Weather.date >= week_ago
@@ -63,18 +150,14 @@ class EnhancedKopikAgent:
                 Event.start_date <= today + timedelta(days=14)
             ).all()
 
-            recent_sales = db.query(Sale).filter(
-                Sale.sale_date >= week_ago
-            ).all()
+            recent_sales = aggregate_sales(db, week_ago)
 
             pending_orders = db.query(Order).filter(
                 Order.status.in_([OrderStatus.PENDING, OrderStatus.DELAYED])
             ).all()
 
             # Sales trends (last 30 days)
-            sales_trends = db.query(Sale).filter(
-                Sale.sale_date >= month_ago
-            ).all()
+            sales_trends = aggregate_sales(db, month_ago)
 
             return {
                 "inventory": low_stock_items,
@@ -89,27 +172,16 @@ class EnhancedKopikAgent:
         finally:
             db.close()
 
-    def analyze_food_waste(self, waste_data: List[Any]) -> tuple:
+    def analyze_food_waste(self, waste_summary: Dict) -> tuple:
         """Analyze food waste patterns and generate recommendations"""
         alerts = []
         solutions = []
 
-        if not waste_data:
+        if not waste_summary or not waste_summary.get("records"):
             return alerts, solutions
 
-        # Group waste by item and reason
-        waste_by_item = {}
-        waste_by_reason = {}
-        total_cost_impact = 0
-
-        for waste in waste_data:
-            item_id = waste.item_id
-            reason = waste.reason
-            cost = waste.cost_impact
-
-            waste_by_item[item_id] = waste_by_item.get(item_id, 0) + cost
-            waste_by_reason[reason] = waste_by_reason.get(reason, 0) + cost
-            total_cost_impact += cost
+        waste_by_item = {item_id: totals["cost"] for item_id, totals in waste_summary["by_item"].items()}
+        waste_by_reason = {reason: totals["cost"] for reason, totals in waste_summary["by_reason"].items()}
 
         # High waste items
         high_waste_threshold = 50.0  # $50 in waste per week
@@ -149,7 +221,7 @@ class EnhancedKopikAgent:
 
         return alerts, solutions
 
-    def analyze_weather_impact(self, weather_data: List[Any], sales_data: List[Any]) -> tuple:
+    def analyze_weather_impact(self, weather_data: List[Any], sales_summary: Dict) -> tuple:
         """Analyze weather patterns and their impact on sales"""
         alerts = []
         solutions = []
@@ -260,28 +332,16 @@ class EnhancedKopikAgent:
 
         return alerts, solutions
 
-    def analyze_sales_trends(self, sales_data: List[Any]) -> tuple:
+    def analyze_sales_trends(self, sales_summary: Dict) -> tuple:
         """Analyze sales trends and patterns"""
         alerts = []
         solutions = []
 
-        if not sales_data:
+        if not sales_summary or not sales_summary.get("transactions"):
             return alerts, solutions
 
-        # Group sales by item
-        sales_by_item = {}
-        total_revenue = 0
-
-        for sale in sales_data:
-            item_id = sale.item_id
-            amount = sale.total_amount
-
-            if item_id not in sales_by_item:
-                sales_by_item[item_id] = {"revenue": 0, "quantity": 0}
-
-            sales_by_item[item_id]["revenue"] += amount
-            sales_by_item[item_id]["quantity"] += sale.quantity_sold
-            total_revenue += amount
+        sales_by_item = sales_summary["by_item"]
+        total_revenue = sales_summary["revenue"]
 
         # Identify top performers
         sorted_items = sorted(sales_by_item.items(), key=lambda x: x[1]["revenue"], reverse=True)
@@ -384,22 +444,26 @@ class EnhancedKopikAgent:
         try:
             # Import LLM service
             parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            sys.path.append(parent_dir)
+            if parent_dir not in sys.path:
+                sys.path.append(parent_dir)
             from llm_summary import llm_service
 
             return llm_service.generate_business_summary(all_alerts, all_solutions, data_overview)
         except Exception as e:
             print(f"⚠️ LLM summary failed, using fallback: {e}")
-            # Fallback summary
-            high_priority = len([a for a in all_alerts if a.get('priority') == 'high'])
-            total_impact = sum(s.get('profit_impact', 0) for s in all_solutions)
-
-            if high_priority > 0:
-                return f"URGENT: {high_priority} critical issues detected. AI analysis identified ${total_impact:.0f} in potential profit optimization across {len(all_solutions)} recommendations."
-            elif len(all_alerts) > 0:
-                return f"ATTENTION: {len(all_alerts)} items need attention. ${total_impact:.0f} in optimization opportunities identified."
-            else:
-                return f"GOOD: Operations running smoothly. ${total_impact:.0f} in potential optimizations available."
+            return self.fallback_summary(all_alerts, all_solutions)
+
+    def fallback_summary(self, all_alerts: List[Dict], all_solutions: List[Dict]) -> str:
+        """Deterministic summary used when the LLM is unavailable or too slow"""
+        high_priority = len([a for a in all_alerts if a.get('priority') == 'high'])
+        total_impact = sum(s.get('profit_impact', 0) for s in all_solutions)
+
+        if high_priority > 0:
+            return f"URGENT: {high_priority} critical issues detected. AI analysis identified ${total_impact:.0f} in potential profit optimization across {len(all_solutions)} recommendations."
+        elif len(all_alerts) > 0:
+            return f"ATTENTION: {len(all_alerts)} items need attention. ${total_impact:.0f} in optimization opportunities identified."
+        else:
+            return f"GOOD: Operations running smoothly. ${total_impact:.0f} in potential optimizations available."
 
     def run_comprehensive_analysis(self):
         """Run complete analysis of all data sources"""
@@ -411,10 +475,10 @@ class EnhancedKopikAgent:
 
             print(f"📊 Data summary:")
             print(f"   - Inventory: {len(data['inventory'])} low stock items")
-            print(f"   - Food waste: {len(data['food_waste'])} recent waste records")
+            print(f"   - Food waste: {data['food_waste']['records']} recent waste records")
             print(f"   - Weather: {len(data['weather'])} recent weather records")
             print(f"   - Events: {len(data['events'])} upcoming events")
-            print(f"   - Sales: {len(data['sales'])} recent sales")
+            print(f"   - Sales: {data['sales']['transactions']} recent sales")
             print(f"   - Orders: {len(data['orders'])} pending/delayed orders")
 
             all_alerts = []
@@ -462,7 +526,7 @@ class EnhancedKopikAgent:
             # Generate LLM summary
             data_overview = {
                 "low_stock_items": len(data['inventory']),
-                "recent_waste_records": len(data['food_waste']),
+                "recent_waste_records": data['food_waste']['records'],
                 "upcoming_events": len(data['events']),
                 "pending_orders": len(data['orders'])
             }
@@ -518,7 +582,8 @@ class EnhancedKopikAgent:
 
             solutions.append({
                 "description": f"Reorder {item.name} immediately or source from alternative supplier",
-                "confidence": random.uniform(75.0, 99.0),
+                # Seeded per item so unchanged data yields identical prompts (and LLM cache hits)
+                "confidence": random.Random(item.item_id).uniform(75.0, 99.0),
                 "profit_impact": profit_impact,
                 "priority": priority
             })
@@ -526,26 +591,24 @@ class EnhancedKopikAgent:
         return alerts, solutions
 
     def store_recommendations(self, solutions: List[Dict]):
-        """Store new recommendations in database"""
+        """Store recommendations in database, refreshing ones already seen instead of duplicating them"""
         db = SessionLocal()
         try:
-            stored_count = 0
-            for solution in solutions:
-                recommendation = Recommendation(
-                    priority=Priority.MEDIUM,
-                    title="Enhanced AI Agent Recommendation",
-                    description=solution["description"],
-                    confidence=solution["confidence"],
-                    profit_impact=solution.get("profit_impact"),
-                    action_required=True,
-                    category=RecommendationCategory.INVENTORY
-                )
-
-                db.add(recommendation)
-                stored_count += 1
+            stored_count = upsert_recommendations(db, [
+                {
+                    "priority": Priority.MEDIUM,
+                    "title": "Enhanced AI Agent Recommendation",
+                    "description": solution["description"],
+                    "confidence": solution["confidence"],
+                    "profit_impact": solution.get("profit_impact"),
+                    "action_required": True,
+                    "category": RecommendationCategory.INVENTORY
+                }
+                for solution in solutions
+            ])
 
             db.commit()
-            print(f"💾 Stored {stored_count} new recommendations")
+            print(f"💾 Stored {stored_count} recommendations")
 
         except Exception as e:
             print(f"❌ Error storing recommendations: {e}")
@@ -10,8 +10,12 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database import get_db, InventoryItem as DBInventoryItem, IntelligenceSignal as DBIntelligenceSignal, Recommendation as DBRecommendation
+from sqlalchemy import select
+
+from async_database import AsyncSessionLocal
+from database import InventoryItem as DBInventoryItem, IntelligenceSignal as DBIntelligenceSignal, Recommendation as DBRecommendation
 from models import RecommendationCreate, Priority, RecommendationCategory
+from recommendation_store import upsert_recommendations
 
 # Pydantic models for agent communication
 class AnalysisRequest(Model):
@@ -104,31 +108,28 @@ async def handle_analysis_request(ctx: Context, sender: str, msg: AnalysisReques
         await ctx.send(sender, error_response)
 
 async def fetch_from_database() -> Dict[str, Any]:
-    """Fetch data directly from the database"""
-    db = next(get_db())
-    try:
+    """Fetch data directly from the database without blocking the agent's event loop"""
+    async with AsyncSessionLocal() as db:
         # Get low stock items
-        low_stock_items = db.query(DBInventoryItem).filter(
+        low_stock_items = (await db.execute(select(DBInventoryItem).where(
             DBInventoryItem.current_stock <= DBInventoryItem.reorder_point
-        ).all()
+        ))).scalars().all()
 
         # Get recent intelligence signals
-        intelligence_signals = db.query(DBIntelligenceSignal).order_by(
+        intelligence_signals = (await db.execute(select(DBIntelligenceSignal).order_by(
             DBIntelligenceSignal.created_at.desc()
-        ).limit(50).all()
+        ).limit(50))).scalars().all()
 
         # Get high priority recommendations
-        recommendations = db.query(DBRecommendation).filter(
+        recommendations = (await db.execute(select(DBRecommendation).where(
             DBRecommendation.priority == Priority.HIGH
-        ).all()
+        ))).scalars().all()
 
         return {
             "inventory": [item.__dict__ for item in low_stock_items],
             "intelligence_signals": [signal.__dict__ for signal in intelligence_signals],
             "recommendations": [rec.__dict__ for rec in recommendations]
         }
-    finally:
-        db.close()
 
 async def fetch_from_api(api_base_url: str) -> Dict[str, Any]:
     """Fetch data from API endpoints"""
@@ -254,29 +255,26 @@ async def process_existing_recommendations(recommendations: List[Dict], alerts:
 
 async def store_recommendations(solutions: List[SolutionData], ctx: Context):
     """Store new recommendations in the database"""
-    db = next(get_db())
-    try:
-        for solution in solutions:
-            recommendation = RecommendationCreate(
-                priority=Priority.MEDIUM,
-                title="AI Agent Recommendation",
-                description=solution.description,
-                confidence=solution.confidence,
-                profit_impact=solution.profit_impact,
-                action_required=True,
-                category=RecommendationCategory.INVENTORY,
-                trigger_sources=["intelligence_agent"]
-            )
-
-            db_recommendation = DBRecommendation(**recommendation.dict())
-            db.add(db_recommendation)
-
-        db.commit()
-    except Exception as e:
-        ctx.logger.error(f"Error storing recommendations: {str(e)}")
-        db.rollback()
-    finally:
-        db.close()
+    async with AsyncSessionLocal() as db:
+        try:
+            await db.run_sync(upsert_recommendations, [
+                RecommendationCreate(
+                    priority=Priority.MEDIUM,
+                    title="AI Agent Recommendation",
+                    description=solution.description,
+                    confidence=solution.confidence,
+                    profit_impact=solution.profit_impact,
+                    action_required=True,
+                    category=RecommendationCategory.INVENTORY,
+                    trigger_sources=["intelligence_agent"]
+                ).dict()
+                for solution in solutions
+            ])
+
+            await db.commit()
+        except Exception as e:
+            ctx.logger.error(f"Error storing recommendations: {str(e)}")
+            await db.rollback()
 
 def generate_summary(alerts: List[AlertData]) -> str:
     """Generate a summary of alerts"""
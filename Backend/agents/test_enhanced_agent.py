@@ -105,10 +105,10 @@ def demonstrate_enhanced_analysis():
 
     print(f"📊 Data Retrieved:")
     print(f"   - {len(data['inventory'])} low stock inventory items")
-    print(f"   - {len(data['food_waste'])} recent waste records")
+    print(f"   - {data['food_waste']['records']} recent waste records")
     print(f"   - {len(data['weather'])} weather records")
     print(f"   - {len(data['events'])} upcoming events")
-    print(f"   - {len(data['sales'])} recent sales")
+    print(f"   - {data['sales']['transactions']} recent sales")
     print(f"   - {len(data['orders'])} pending/delayed orders")
 
     # Analyze each category individually
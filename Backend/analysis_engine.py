@@ -0,0 +1,267 @@
+"""
+Application-scoped Analysis Engine for Kopik
+Created once at FastAPI startup; owns the intelligence agent, the LLM service
+clients and the most recent results so routes pay no per-request setup cost
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from fastapi import Request
+
+from agents.enhanced_agent import EnhancedKopikAgent
+from dashboard_snapshot import assemble_dashboard
+from llm_fanout import LLMCall, gather_llm_calls
+from models import Priority
+from recommendation_store import RECOMMENDATION_COMPACTION_INTERVAL_SECONDS, run_compaction
+from archive_store import ARCHIVE_INTERVAL_SECONDS, run_archival
+import analytics_snapshot
+
+
+class AnalysisEngine:
+    """Long-lived owner of the agent and LLM clients, shared by every intelligence route"""
+
+    def __init__(self):
+        self.agent = EnhancedKopikAgent()
+        self.started_at = datetime.now()
+
+        # LLM clients are configured once here instead of being imported per request
+        try:
+            from llm_explanations import explanation_service
+            from llm_risk_analyzer import risk_analyzer
+            from llm_menu_optimizer import menu_optimizer
+
+            self.explanation_service = explanation_service
+            self.risk_analyzer = risk_analyzer
+            self.menu_optimizer = menu_optimizer
+            self.llm_error = None
+        except Exception as e:
+            self.explanation_service = None
+            self.risk_analyzer = None
+            self.menu_optimizer = None
+            self.llm_error = f"Advanced LLM features unavailable: {str(e)[:50]}"
+
+        # run_comprehensive_analysis mutates agent state (analysis_count, last_summary)
+        self._analysis_lock = threading.Lock()
+        self.dashboards_built = 0
+        self.last_dashboard_duration_ms = None
+        self.last_analysis_duration_ms = None
+        self.last_analysis_success = None
+        self.last_compaction_at = None
+        self.last_compaction = None
+        self.last_archival_at = None
+        self.last_archival = None
+        self.last_snapshot_refresh_at = None
+        self.last_snapshot_refresh = None
+
+    def attach(self, snapshot_service, trigger):
+        """Point the dashboard snapshot and background analysis trigger at this engine"""
+        snapshot_service.builder = self.build_dashboard
+        trigger.run_analysis = self.run_analysis
+
+    def prepare_dashboard(self) -> Dict:
+        """Run the deterministic part of the dashboard: data fetch, analyzers and metrics"""
+        agent = self.agent
+        data = agent.fetch_comprehensive_data()
+
+        # Run analyses
+        inventory_alerts, inventory_solutions = agent.analyze_inventory(data['inventory'])
+        waste_alerts, waste_solutions = agent.analyze_food_waste(data['food_waste'])
+        weather_alerts, weather_solutions = agent.analyze_weather_impact(data['weather'], data['sales'])
+        event_alerts, event_solutions = agent.analyze_events(data['events'])
+        order_alerts, order_solutions = agent.analyze_orders(data['orders'])
+
+        # Combine results
+        all_alerts = inventory_alerts + waste_alerts + weather_alerts + event_alerts + order_alerts
+        all_solutions = inventory_solutions + waste_solutions + weather_solutions + event_solutions + order_solutions
+
+        # Calculate metrics
+        high_priority_count = len([a for a in all_alerts if a.get('priority') == Priority.HIGH.value])
+        total_profit_impact = sum(s.get('profit_impact', 0) for s in all_solutions)
+
+        # Generate data overview for summary
+        data_overview = {
+            "low_stock_items": len(data['inventory']),
+            "recent_waste_records": data['food_waste']['records'],
+            "upcoming_events": len(data['events']),
+            "pending_orders": len(data['orders'])
+        }
+
+        built_at = datetime.now().isoformat()
+
+        return {
+            "data": data,
+            "all_alerts": all_alerts,
+            "all_solutions": all_solutions,
+            "top_solutions": all_solutions[:10],  # Limit to top 10
+            "data_overview": data_overview,
+            "llm_error": self.llm_error,
+            "timestamp": built_at,
+            "metrics": {
+                "total_alerts": len(all_alerts),
+                "high_priority_alerts": high_priority_count,
+                "total_recommendations": len(all_solutions),
+                "total_profit_impact": round(total_profit_impact, 2)
+            },
+            "alerts": [
+                {
+                    "id": i + 1,
+                    "type": alert.get("type", "general"),
+                    "title": alert.get("type", "general").replace("_", " ").title(),
+                    "message": alert.get("message", ""),
+                    "priority": str(alert.get("priority", "medium")).replace("Priority.", "").lower(),
+                    "category": str(alert.get("category", "inventory")).replace("RecommendationCategory.", "").lower(),
+                    "timestamp": built_at,
+                    "actionable": True
+                }
+                for i, alert in enumerate(all_alerts[:10])  # Limit to top 10
+            ]
+        }
+
+    def dashboard_llm_calls(self, prepared: Dict) -> Dict[str, LLMCall]:
+        """Independent LLM calls for a prepared dashboard, keyed by dashboard section"""
+        agent = self.agent
+        data = prepared["data"]
+        all_alerts = prepared["all_alerts"]
+        all_solutions = prepared["all_solutions"]
+        data_overview = prepared["data_overview"]
+
+        calls = {
+            "summary": LLMCall(
+                fn=lambda: agent.generate_summary(all_alerts, all_solutions, data_overview),
+                fallback=lambda: agent.fallback_summary(all_alerts, all_solutions)
+            )
+        }
+
+        # Enhanced LLM Features
+        if self.llm_error:
+            return calls
+
+        calls["risk_analysis"] = LLMCall(
+            fn=lambda: self.risk_analyzer.analyze_business_patterns(data),
+            fallback=lambda: {
+                "risk_level": "moderate",
+                "overall_assessment": "Risk analysis did not finish in time",
+                "top_risks": [],
+                "opportunities": [],
+                "operational_insights": [],
+                "key_patterns": []
+            }
+        )
+        calls["menu_optimization"] = LLMCall(
+            fn=lambda: self.menu_optimizer.generate_menu_suggestions(data),
+            fallback=lambda: {
+                "overall_strategy": "Menu optimization did not finish in time",
+                "total_estimated_impact": 0,
+                "implementation_timeline": "unavailable",
+                "menu_suggestions": [],
+                "operational_benefits": [],
+                "waste_reduction_impact": {"items_utilized": [], "estimated_savings": 0}
+            }
+        )
+        calls["explanations"] = LLMCall(
+            fn=lambda: self.explanation_service.explain_recommendations(
+                [{**solution, "id": i} for i, solution in enumerate(prepared["top_solutions"])], data_overview
+            ),
+            fallback=lambda: {},
+            fill=lambda explanations: self.missing_explanation_calls(prepared, explanations)
+        )
+        return calls
+
+    def missing_explanation_calls(self, prepared: Dict, explanations: Dict[str, str]) -> Dict[str, LLMCall]:
+        """One LLM call per top recommendation the batched explanation response left out, keyed by its id"""
+        data_overview = prepared["data_overview"]
+        return {
+            str(i): LLMCall(
+                fn=lambda solution=solution: self.explanation_service.explain_recommendation(solution, data_overview),
+                fallback=lambda: None  # render_recommendations supplies a generic explanation
+            )
+            for i, solution in enumerate(prepared["top_solutions"])
+            if str(i) not in explanations
+        }
+
+    def build_dashboard(self) -> Dict:
+        """Run the full agent analysis and render the dashboard response"""
+        started = time.perf_counter()
+        prepared = self.prepare_dashboard()
+        # Fan out every independent LLM call at once; each has its own deadline
+        results, fallback_sections = gather_llm_calls(self.dashboard_llm_calls(prepared))
+        payload = assemble_dashboard(prepared, results, fallback_sections)
+
+        self.dashboards_built += 1
+        self.last_dashboard_duration_ms = (time.perf_counter() - started) * 1000
+        return payload
+
+    def run_analysis(self) -> bool:
+        """Run a comprehensive analysis and store its recommendations"""
+        with self._analysis_lock:
+            started = time.perf_counter()
+            self._maybe_refresh_analytics_snapshot()
+            success = self.agent.run_comprehensive_analysis()
+            self.last_analysis_duration_ms = (time.perf_counter() - started) * 1000
+            self.last_analysis_success = success
+            self._maybe_compact_recommendations()
+            self._maybe_archive()
+            return success
+
+    def _maybe_compact_recommendations(self):
+        """Expire stale recommendations at most once per compaction interval"""
+        now = time.monotonic()
+        if self.last_compaction_at is not None and now - self.last_compaction_at < RECOMMENDATION_COMPACTION_INTERVAL_SECONDS:
+            return
+        self.last_compaction_at = now
+        try:
+            self.last_compaction = run_compaction()
+        except Exception as e:
+            print(f"⚠️ Recommendation compaction failed: {e}")
+
+    def _maybe_archive(self):
+        """Move sales and waste past the archive horizon to cold storage at most once per archive interval"""
+        now = time.monotonic()
+        if self.last_archival_at is not None and now - self.last_archival_at < ARCHIVE_INTERVAL_SECONDS:
+            return
+        self.last_archival_at = now
+        try:
+            self.last_archival = run_archival()
+        except Exception as e:
+            print(f"⚠️ Archival failed: {e}")
+
+    def _maybe_refresh_analytics_snapshot(self):
+        """Append new sales and waste to the columnar analytics snapshot at most once per refresh interval"""
+        if analytics_snapshot.np is None:
+            return  # optional; the aggregates read the running totals instead
+        now = time.monotonic()
+        if self.last_snapshot_refresh_at is not None and now - self.last_snapshot_refresh_at < analytics_snapshot.ANALYTICS_SNAPSHOT_INTERVAL_SECONDS:
+            return
+        self.last_snapshot_refresh_at = now
+        try:
+            self.last_snapshot_refresh = [analytics_snapshot.refresh(name) for name in analytics_snapshot.SNAPSHOT_TABLES]
+        except Exception as e:
+            print(f"⚠️ Analytics snapshot refresh failed: {e}")
+
+    @property
+    def last_analysis(self) -> Optional[Dict]:
+        """Alerts, solutions and summary from the most recent comprehensive analysis"""
+        return self.agent.last_analysis_data
+
+    def status(self) -> Dict:
+        return {
+            "started_at": self.started_at.isoformat(),
+            "llm_available": self.llm_error is None,
+            "dashboards_built": self.dashboards_built,
+            "last_dashboard_duration_ms": round(self.last_dashboard_duration_ms, 1) if self.last_dashboard_duration_ms is not None else None,
+            "analysis_count": self.agent.analysis_count,
+            "last_analysis_duration_ms": round(self.last_analysis_duration_ms, 1) if self.last_analysis_duration_ms is not None else None,
+            "last_analysis_success": self.last_analysis_success,
+            "last_analysis_at": self.last_analysis["timestamp"] if self.last_analysis else None,
+            "last_recommendation_compaction": self.last_compaction,
+            "last_archival": self.last_archival,
+            "last_analytics_snapshot_refresh": self.last_snapshot_refresh
+        }
+
+
+def get_analysis_engine(request: Request) -> AnalysisEngine:
+    """FastAPI dependency returning the engine created at startup"""
+    return request.app.state.analysis_engine
@@ -0,0 +1,112 @@
+"""
+Debounced Background Analysis Trigger for Kopik
+Coalesces bursts of inventory writes into a single in-process analysis run
+after a short quiet window, so write endpoints never wait on the agent
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+ANALYSIS_QUIET_SECONDS = float(os.getenv('ANALYSIS_QUIET_SECONDS', '2'))
+ANALYSIS_MAX_DELAY_SECONDS = float(os.getenv('ANALYSIS_MAX_DELAY_SECONDS', '30'))
+
+
+class AnalysisTrigger:
+    """Schedules analysis runs on a background thread once writes have gone quiet"""
+
+    def __init__(self, run_analysis: Optional[Callable[[], bool]] = None,
+                 quiet_seconds: float = ANALYSIS_QUIET_SECONDS,
+                 max_delay_seconds: float = ANALYSIS_MAX_DELAY_SECONDS):
+        self.run_analysis = run_analysis  # set by AnalysisEngine.attach at application startup
+        self.quiet_seconds = quiet_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self._lock = threading.Lock()
+        self._timer = None
+        self._running = False
+        self._pending = 0  # requests received since the last run started
+        self._first_pending_at = None
+        self.total_requests = 0
+        self.total_runs = 0
+        self.last_reason = None
+        self.last_run_started_at = None
+        self.last_run_duration_ms = None
+        self.last_run_success = None
+        self.last_error = None
+
+    def request(self, reason: str = "data changed"):
+        """Ask for an analysis; returns immediately"""
+        with self._lock:
+            now = time.monotonic()
+            self._pending += 1
+            self.total_requests += 1
+            self.last_reason = reason
+            if self._first_pending_at is None:
+                self._first_pending_at = now
+            if not self._running:
+                self._arm(now)
+
+    def _arm(self, now: float):
+        """(Re)start the quiet-window timer; caller holds the lock"""
+        if self._timer is not None:
+            self._timer.cancel()
+        # Never postpone past max_delay_seconds, even under a steady stream of writes
+        delay = min(self.quiet_seconds, self._first_pending_at + self.max_delay_seconds - now)
+        self._timer = threading.Timer(max(delay, 0.0), self._fire)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _fire(self):
+        with self._lock:
+            if self._running or self._pending == 0:
+                return
+            self._running = True
+            self._timer = None
+            coalesced = self._pending
+            self._pending = 0
+            self._first_pending_at = None
+            self.last_run_started_at = datetime.now()
+
+        print(f"🤖 Running background intelligence analysis ({coalesced} coalesced request(s))...")
+        started = time.perf_counter()
+        try:
+            if self.run_analysis is None:
+                raise RuntimeError("Analysis runner not attached; the analysis engine has not started")
+            success = bool(self.run_analysis())
+            error = None
+        except Exception as e:
+            success = False
+            error = str(e)
+            print(f"❌ Background intelligence analysis failed: {e}")
+
+        with self._lock:
+            self._running = False
+            self.total_runs += 1
+            self.last_run_duration_ms = (time.perf_counter() - started) * 1000
+            self.last_run_success = success
+            self.last_error = error
+            # Writes that arrived mid-run get their own run after a fresh quiet window
+            if self._pending:
+                self._arm(time.monotonic())
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            return {
+                "queue_depth": self._pending,
+                "running": self._running,
+                "scheduled": self._timer is not None,
+                "quiet_seconds": self.quiet_seconds,
+                "max_delay_seconds": self.max_delay_seconds,
+                "total_requests": self.total_requests,
+                "total_runs": self.total_runs,
+                "last_reason": self.last_reason,
+                "last_run_started_at": self.last_run_started_at.isoformat() if self.last_run_started_at else None,
+                "last_run_duration_ms": round(self.last_run_duration_ms, 1) if self.last_run_duration_ms is not None else None,
+                "last_run_success": self.last_run_success,
+                "last_error": self.last_error
+            }
+
+# Singleton
+analysis_trigger = AnalysisTrigger()
@@ -0,0 +1,66 @@
+"""
+API Stack Selection for Kopik
+One set of routes (routes.py) serves both stacks. A route body is a plain
+function of a sync Session; API_STACK decides where it runs:
+
+- async (default): AsyncSession.run_sync, on the event loop with the driver's
+  I/O awaited, so request concurrency is bounded by the loop rather than the
+  threadpool. Needs aiosqlite (SQLite) or asyncpg (Postgres)
+- sync: a SessionLocal session on the threadpool
+
+Either way the session is opened and closed around the body, so a request holds
+a pooled connection only while its body runs and never while it waits for a
+worker thread
+"""
+
+import functools
+import inspect
+import os
+
+from fastapi.concurrency import run_in_threadpool
+
+from db_config import DATABASE_URL, async_driver_available
+from database import SessionLocal
+
+API_STACK = os.getenv('API_STACK', 'async').lower()
+if API_STACK == "async" and not async_driver_available(DATABASE_URL):
+    print("⚠️ Async database driver not installed; serving the sync API stack")
+    API_STACK = "sync"
+
+if API_STACK == "async":
+    from async_database import AsyncSessionLocal
+
+
+async def run_db(fn, *args, **kwargs):
+    """Run fn(session, *args, **kwargs) in a session of its own on the selected stack"""
+    if API_STACK == "async":
+        async with AsyncSessionLocal() as db:
+            return await db.run_sync(fn, *args, **kwargs)
+
+    def run():
+        db = SessionLocal()
+        try:
+            return fn(db, *args, **kwargs)
+        finally:
+            db.close()
+
+    return await run_in_threadpool(run)
+
+
+def db_route(route):
+    """
+    Serve a sync route body taking db: Session on the selected stack
+
+    The db parameter is dropped from the signature FastAPI sees; run_db supplies
+    the session instead.
+    """
+    signature = inspect.signature(route)
+
+    @functools.wraps(route)
+    async def endpoint(**kwargs):
+        return await run_db(lambda db: route(db=db, **kwargs))
+
+    endpoint.__signature__ = signature.replace(
+        parameters=[parameter for name, parameter in signature.parameters.items() if name != "db"]
+    )
+    return endpoint
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Cold Storage Archive for Kopik
+Moves sales, food waste and expired recommendations older than a horizon out
+of the hot tables into gzip-compressed JSONL files partitioned by month, and
+reads them back when a query reaches past the horizon
+
+Layout: ARCHIVE_DIR/<table>/<YYYY-MM>.jsonl.gz plus a manifest.json recording
+the date before which the table has been archived
+
+Usage:
+    python archive_store.py [--horizon-days 365]
+"""
+
+import argparse
+import gzip
+import json
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from database import SessionLocal, Sale, FoodWaste, Recommendation
+
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', './archive')
+# Keep this above RUNNING_AGGREGATE_DAYS: the waste totals are rebuilt from the hot table
+ARCHIVE_HORIZON_DAYS = int(os.getenv('ARCHIVE_HORIZON_DAYS', '365'))
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv('ARCHIVE_INTERVAL_SECONDS', '86400'))
+
+_DELETE_CHUNK = 500
+
+
+class ArchiveTable(NamedTuple):
+    """A hot table whose old rows move to the archive"""
+    model: type
+    date_column: str  # partitions by month of this column
+
+
+ARCHIVE_TABLES = {
+    "sales": ArchiveTable(Sale, "sale_date"),
+    "food_waste": ArchiveTable(FoodWaste, "waste_date"),
+    "recommendations": ArchiveTable(Recommendation, "last_seen_at")
+}
+
+
+def _table_dir(name: str) -> str:
+    return os.path.join(ARCHIVE_DIR, name)
+
+
+def _partition_path(name: str, month: str) -> str:
+    return os.path.join(_table_dir(name), f"{month}.jsonl.gz")
+
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _month(value) -> str:
+    return _as_date(value).strftime("%Y-%m")
+
+
+def _row_dict(row) -> Dict:
+    """Column values of an ORM row, JSON-ready"""
+    values = {}
+    for column in row.__table__.columns:
+        value = getattr(row, column.key)
+        values[column.key] = value.isoformat() if isinstance(value, (date, datetime)) else value
+    return values
+
+
+def read_partition(name: str, month: str) -> List[Dict]:
+    """Rows of one month's partition (empty if it does not exist)"""
+    path = _partition_path(name, month)
+    if not os.path.exists(path):
+        return []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _write_partition(name: str, month: str, rows: List[Dict]):
+    """Replace a partition atomically: write a temp file, then rename over the old one"""
+    os.makedirs(_table_dir(name), exist_ok=True)
+    path = _partition_path(name, month)
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, separators=(",", ":")) + "\n")
+    os.replace(tmp_path, path)
+
+
+def _merge_into_partition(name: str, month: str, rows: List[Dict]):
+    # Merging by id makes a re-run after a failed delete idempotent; the archived tables
+    # never reuse an id (AUTOINCREMENT on SQLite, sequences on Postgres), so it is unique
+    merged = {row["id"]: row for row in read_partition(name, month)}
+    merged.update((row["id"], row) for row in rows)
+    date_column = ARCHIVE_TABLES[name].date_column
+    _write_partition(name, month, sorted(merged.values(), key=lambda row: (row[date_column], row["id"])))
+
+
+def max_archived_id(name: str) -> int:
+    """Highest id in any of the table's partitions (0 when nothing is archived)"""
+    directory = _table_dir(name)
+    if not os.path.isdir(directory):
+        return 0
+    highest = 0
+    for filename in os.listdir(directory):
+        if filename.endswith(".jsonl.gz"):
+            month = filename[:-len(".jsonl.gz")]
+            highest = max([highest] + [row["id"] for row in read_partition(name, month)])
+    return highest
+
+
+def archive_boundary(name: str) -> Optional[date]:
+    """Rows dated before this have been moved to the archive (None if nothing has been archived)"""
+    path = os.path.join(_table_dir(name), "manifest.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return date.fromisoformat(json.load(f)["archived_before"])
+
+
+def record_boundary(name: str, before):
+    """Move the archive boundary forward after a committed archival run"""
+    before = _as_date(before)
+    current = archive_boundary(name)
+    if current and current >= before:
+        return
+    os.makedirs(_table_dir(name), exist_ok=True)
+    path = os.path.join(_table_dir(name), "manifest.json")
+    with open(f"{path}.tmp", "w") as f:
+        json.dump({"archived_before": before.isoformat(), "updated_at": datetime.utcnow().isoformat()}, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def archive_table(db, name: str, before) -> int:
+    """
+    Move rows dated before a cutoff into the table's monthly partitions
+
+    Partitions are written before the rows are deleted, so a failure leaves the
+    rows in the hot table rather than losing them. The caller commits.
+
+    Args:
+        db: Session
+        name: Key of ARCHIVE_TABLES
+        before: date or datetime cutoff
+
+    Returns:
+        int: Rows archived
+    """
+    table = ARCHIVE_TABLES[name]
+    column = getattr(table.model, table.date_column)
+    if column.type.python_type is datetime and not isinstance(before, datetime):
+        before = datetime.combine(before, datetime.min.time())
+
+    by_month = {}
+    ids = []
+    for row in db.query(table.model).filter(column < before).order_by(column, table.model.id).yield_per(1000):
+        by_month.setdefault(_month(getattr(row, table.date_column)), []).append(_row_dict(row))
+        ids.append(row.id)
+
+    for month, rows in by_month.items():
+        _merge_into_partition(name, month, rows)
+
+    # Delete exactly the rows written out; rows inserted meanwhile wait for the next run
+    for start in range(0, len(ids), _DELETE_CHUNK):
+        db.query(table.model).filter(
+            table.model.id.in_(ids[start:start + _DELETE_CHUNK])
+        ).delete(synchronize_session=False)
+    return len(ids)
+
+
+def archived_rows(name: str, since, until=None, **equals) -> List[Dict]:
+    """
+    Archived rows dated in [since, until), optionally filtered by exact column values
+
+    Only the monthly partitions overlapping the range are opened.
+    """
+    boundary = archive_boundary(name)
+    if boundary is None:
+        return []
+    since = _as_date(since)
+    until = min(_as_date(until), boundary) if until else boundary
+    if since >= until:
+        return []
+
+    date_column = ARCHIVE_TABLES[name].date_column
+    rows = []
+    month = date(since.year, since.month, 1)
+    while month < until:
+        for row in read_partition(name, month.strftime("%Y-%m")):
+            if since <= _as_date(row[date_column]) < until and all(row.get(k) == v for k, v in equals.items()):
+                rows.append(row)
+        month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+    return rows
+
+
+def include_archived(hot_rows: Iterable, name: str, since, **equals) -> List:
+    """
+    Hot rows plus any archived rows from since onwards, newest first
+
+    The route's query already covers the hot table; archived partitions are only
+    read when since reaches past the archive boundary.
+    """
+    hot_rows = list(hot_rows)
+    boundary = archive_boundary(name)
+    if boundary is None or _as_date(since) >= boundary:
+        return hot_rows
+
+    date_column = ARCHIVE_TABLES[name].date_column
+
+    def sort_key(row):
+        if isinstance(row, dict):
+            return _as_date(row[date_column]), row["id"]
+        return _as_date(getattr(row, date_column)), row.id
+
+    # A row archived by a run whose delete was rolled back is still hot; keep the hot copy
+    hot_ids = {row.id for row in hot_rows}
+    archived = [row for row in archived_rows(name, since, **equals) if row["id"] not in hot_ids]
+    return sorted(hot_rows + archived, key=sort_key, reverse=True)
+
+
+def run_archival(horizon_days: int = ARCHIVE_HORIZON_DAYS) -> Dict:
+    """Archive sales and food waste older than the horizon, each table in its own transaction"""
+    before = date.today() - timedelta(days=horizon_days)
+    result = {"archived_before": before.isoformat()}
+    db = SessionLocal()
+    try:
+        for name in ("sales", "food_waste"):
+            try:
+                result[name] = archive_table(db, name, before)
+                db.commit()
+                if result[name]:
+                    record_boundary(name, before)
+            except Exception:
+                db.rollback()
+                raise
+        print(f"🧊 Archived rows older than {before}: {result['sales']} sales, {result['food_waste']} food waste")
+        return result
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move old sales and food waste into compressed monthly archives")
+    parser.add_argument("--horizon-days", type=int, default=ARCHIVE_HORIZON_DAYS,
+                        help="keep this many days of history in the database")
+    args = parser.parse_args()
+    print(run_archival(args.horizon_days))
@@ -0,0 +1,22 @@
+"""
+Async Database Access for Kopik
+AsyncEngine/AsyncSession counterpart of database.py for the async route stack;
+same models and DATABASE_URL, driven by aiosqlite locally or asyncpg on Postgres
+"""
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from db_config import DATABASE_URL, create_async_database_engine
+from table_versions import track_table_versions
+
+# Raises ImportError when the async driver for DATABASE_URL is not installed
+async_engine = create_async_database_engine(DATABASE_URL)
+track_table_versions(async_engine.sync_engine)
+
+# Objects stay loaded after commit: an AsyncSession cannot lazy-load expired attributes
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+API Stack Load Benchmark for Kopik
+Starts the API once per stack (API_STACK=sync and API_STACK=async) under uvicorn
+against the configured database, drives both with the same concurrent read mix,
+and reports throughput and latency percentiles
+
+Usage:
+    python benchmark_api_stacks.py --concurrency 200 --duration 15
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+READ_MIX = [
+    "/api/inventory-items/",
+    "/api/inventory-items/low-stock/",
+    "/api/recommendations/?priority=high",
+    "/api/sales/recent/",
+    "/api/orders/pending/",
+    "/api/events/upcoming/",
+    "/api/weather/current/"
+]
+
+
+def start_server(stack: str, port: int) -> subprocess.Popen:
+    env = {**os.environ, "API_STACK": stack}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env
+    )
+
+
+async def wait_until_ready(base_url: str, timeout: float = 60.0) -> str:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                response = await client.get("/health")
+                if response.status_code == 200:
+                    return response.json().get("api_stack", "unknown")
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError(f"server at {base_url} did not start")
+
+
+async def run_load(base_url: str, concurrency: int, duration: float) -> dict:
+    latencies = []
+    errors = 0
+    stop_at = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        async def worker(offset: int):
+            nonlocal errors
+            i = offset
+            while time.monotonic() < stop_at:
+                path = READ_MIX[i % len(READ_MIX)]
+                i += 1
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code >= 500:
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000 if latencies else 0.0
+
+    return {
+        "requests_per_sec": len(latencies) / duration,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "errors": errors
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the sync and async API stacks under concurrent load")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"🏁 {args.concurrency} concurrent clients for {args.duration:.0f}s per stack, read mix of {len(READ_MIX)} routes")
+    for offset, stack in enumerate(("sync", "async")):
+        port = args.port + offset
+        base_url = f"http://127.0.0.1:{port}"
+        server = start_server(stack, port)
+        try:
+            served = asyncio.run(wait_until_ready(base_url))
+            if served != stack:
+                print(f"   {stack:<6} skipped: server fell back to the {served} stack")
+                continue
+            result = asyncio.run(run_load(base_url, args.concurrency, args.duration))
+            print(f"   {stack:<6} {result['requests_per_sec']:>8.1f} req/s   p50 {result['p50_ms']:>7.1f} ms"
+                  f"   p95 {result['p95_ms']:>7.1f} ms   p99 {result['p99_ms']:>7.1f} ms   errors {result['errors']}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Bulk Ingestion Benchmark for Kopik
+Loads the same batch of sales through POST /api/sales/ one row at a time and
+through POST /api/sales/bulk (JSON array and NDJSON) against a scratch
+database, and reports rows per second for each path
+
+Usage:
+    python benchmark_bulk_ingest.py --rows 2000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Point the app at a scratch database before database.py is imported
+_workdir = tempfile.mkdtemp(prefix="kopik_bulk_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'bulk.db')}"
+os.environ.setdefault("LLM_CACHE_PATH", os.path.join(_workdir, "llm_cache.db"))
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import Base, SessionLocal, engine, InventoryItem, Sale
+
+ITEM_COUNT = 20
+
+
+def reset():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        db.add_all([
+            InventoryItem(item_id=f"BENCH{i:03d}", name=f"Bench item {i}", category="Supplies", current_stock=100.0,
+                          unit="unit", reorder_point=20.0, daily_usage=5.0, cost_per_unit=1.5)
+            for i in range(ITEM_COUNT)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def make_sales(count: int):
+    rng = random.Random(7)
+    today = date.today()
+    return [
+        {
+            "sale_date": (today - timedelta(days=rng.randint(0, 29))).isoformat(),
+            "item_id": f"BENCH{rng.randrange(ITEM_COUNT):03d}",
+            "quantity_sold": 1.0,
+            "unit_price": 4.5,
+            "total_amount": 4.5,
+            "time_of_day": rng.choice(["morning", "afternoon", "evening"])
+        }
+        for _ in range(count)
+    ]
+
+
+def stored_sales() -> int:
+    db = SessionLocal()
+    try:
+        return db.query(Sale).count()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-row vs bulk sales ingestion")
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+    sales = make_sales(args.rows)
+    print(f"🏁 Ingesting {args.rows} sales per path")
+
+    reset()
+    started = time.perf_counter()
+    for sale in sales:
+        response = client.post("/api/sales/", json=sale)
+        assert response.status_code == 200, response.text
+    elapsed = time.perf_counter() - started
+    assert stored_sales() == args.rows
+    single_rate = args.rows / elapsed
+    print(f"   single-row   {single_rate:>10.1f} rows/s   ({elapsed:.2f}s)")
+
+    for label, content, content_type in [
+        ("bulk JSON", json.dumps(sales), "application/json"),
+        ("bulk NDJSON", "\n".join(json.dumps(sale) for sale in sales), "application/x-ndjson")
+    ]:
+        reset()
+        started = time.perf_counter()
+        response = client.post("/api/sales/bulk", content=content, headers={"Content-Type": content_type})
+        elapsed = time.perf_counter() - started
+        assert response.status_code == 200, response.text
+        assert response.json()["inserted"] == args.rows and stored_sales() == args.rows
+        rate = args.rows / elapsed
+        print(f"   {label:<12} {rate:>10.1f} rows/s   ({elapsed:.2f}s, {rate / single_rate:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
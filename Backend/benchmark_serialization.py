@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+List Serialization Benchmark for Kopik
+Seeds a scratch database with sales and food waste, then fetches one large page
+of each through the normal path (ORM objects validated into Pydantic models)
+and the fast path (Core row tuples encoded with orjson), checks both return the
+same body and reports rows per second for each
+
+Usage:
+    python benchmark_serialization.py --rows 10000 [--repeat 3]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+# Point the app at a scratch database before database.py is imported
+_workdir = tempfile.mkdtemp(prefix="kopik_serialize_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'serialize.db')}"
+os.environ.setdefault("LLM_CACHE_PATH", os.path.join(_workdir, "llm_cache.db"))
+os.environ.setdefault("ARCHIVE_DIR", os.path.join(_workdir, "archive"))
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import insert
+
+from database import SessionLocal, InventoryItem, Sale, FoodWaste
+from fast_json import FAST_JSON_MEDIA_TYPE, orjson
+from migrations import reset_schema
+
+ITEM_COUNT = 20
+
+
+def seed(count: int):
+    reset_schema()
+    rng = random.Random(11)
+    today = date.today()
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        db.add_all([
+            InventoryItem(item_id=f"BENCH{i:03d}", name=f"Bench item {i}", category="Supplies", current_stock=100.0,
+                          unit="unit", reorder_point=20.0, daily_usage=5.0, cost_per_unit=1.5)
+            for i in range(ITEM_COUNT)
+        ])
+        db.execute(insert(Sale), [
+            {
+                "sale_date": today - timedelta(days=rng.randint(0, 300)),
+                "item_id": f"BENCH{rng.randrange(ITEM_COUNT):03d}",
+                "quantity_sold": 1.0,
+                "unit_price": 4.5,
+                "total_amount": 4.5,
+                "customer_type": rng.choice(["regular", "tourist", None]),
+                "time_of_day": rng.choice(["morning", "afternoon", "evening"]),
+                "created_at": now
+            }
+            for _ in range(count)
+        ])
+        db.execute(insert(FoodWaste), [
+            {
+                "item_id": f"BENCH{rng.randrange(ITEM_COUNT):03d}",
+                "waste_date": today - timedelta(days=rng.randint(0, 300)),
+                "quantity_wasted": 0.5,
+                "unit": "unit",
+                "reason": rng.choice(["expired", "damaged", "overproduction"]),
+                "cost_impact": 0.75,
+                "created_at": now
+            }
+            for _ in range(count)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def timed_get(client, url: str, headers: dict, repeat: int):
+    """Best of repeat runs, and the last response"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        elapsed = time.perf_counter() - started
+        assert response.status_code == 200, response.text
+        best = elapsed if best is None else min(best, elapsed)
+    return best, response
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pydantic vs fast-path JSON for large list pages")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from fastapi.testclient import TestClient
+    from main import app
+
+    seed(args.rows)
+    encoder = "orjson" if orjson is not None else "json (orjson not installed)"
+    print(f"🏁 Fetching {args.rows} rows per page, best of {args.repeat}, fast path encoder: {encoder}")
+
+    with TestClient(app) as client:
+        for route in ["/api/sales/", "/api/food-waste/"]:
+            url = f"{route}?limit={args.rows}"
+            normal_time, normal = timed_get(client, url, {}, args.repeat)
+            fast_time, fast = timed_get(client, url, {"Accept": FAST_JSON_MEDIA_TYPE}, args.repeat)
+            assert normal.json() == fast.json(), f"{route}: fast path body differs"
+            assert normal.headers.get("X-Next-Cursor") == fast.headers.get("X-Next-Cursor")
+
+            normal_rate = args.rows / normal_time
+            fast_rate = args.rows / fast_time
+            print(f"   {route}")
+            print(f"      pydantic   {normal_rate:>10.0f} rows/s   ({normal_time * 1000:.0f} ms)")
+            print(f"      fast path  {fast_rate:>10.0f} rows/s   ({fast_time * 1000:.0f} ms, {fast_rate / normal_rate:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Bulk Ingestion for Kopik
+Parses a JSON array or NDJSON body, validates every row in one pass and writes
+the valid rows with one batched INSERT in a single transaction, reporting
+per-row errors instead of rejecting the whole batch (atomic=true rejects it
+with a 422 instead). Rows must reference existing inventory items, as the
+single-row POST routes require
+"""
+
+import json
+import os
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import insert, select
+
+from database import InventoryItem, Sale, FoodWaste, Weather, Order
+from models import SaleCreate, FoodWasteCreate, WeatherCreate, OrderCreate
+from running_aggregates import record_sales, record_food_waste_batch
+
+BULK_MAX_ROWS = int(os.getenv('BULK_MAX_ROWS', '50000'))
+
+
+class BulkBodyError(ValueError):
+    """The request body as a whole cannot be ingested"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class BulkTarget(NamedTuple):
+    """A table that accepts bulk ingestion"""
+    label: str
+    model: type
+    schema: type
+    checks_item: bool  # rows reference inventory_items.item_id
+    record_totals: Optional[Callable] = None  # keeps the running daily totals in step
+
+
+BULK_TARGETS = {
+    "sales": BulkTarget("sales", Sale, SaleCreate, True, record_sales),
+    "food_waste": BulkTarget("food waste", FoodWaste, FoodWasteCreate, True, record_food_waste_batch),
+    "weather": BulkTarget("weather", Weather, WeatherCreate, False),
+    "orders": BulkTarget("orders", Order, OrderCreate, True)
+}
+
+_adapters = {}
+
+
+class _Unparseable(NamedTuple):
+    message: str
+
+
+def _value(field):
+    """Enum members are stored by value"""
+    return getattr(field, 'value', field)
+
+
+def parse_bulk_body(body: bytes, content_type: str = "") -> List:
+    """
+    Decode a bulk request body
+
+    Args:
+        body: Raw request body
+        content_type: Request Content-Type; application/x-ndjson (or any body not starting
+            with '[') is read as one JSON object per line
+
+    Returns:
+        list: Row objects; NDJSON lines that are not valid JSON become per-row errors later
+    """
+    try:
+        text = body.decode("utf-8")
+    except UnicodeDecodeError:
+        raise BulkBodyError("Body must be UTF-8 encoded JSON or NDJSON")
+
+    stripped = text.lstrip()
+    if not stripped:
+        return []
+
+    if "ndjson" in content_type or "jsonl" in content_type or not stripped.startswith("["):
+        rows = []
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                rows.append(_Unparseable(f"invalid JSON: {e}"))
+    else:
+        try:
+            rows = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise BulkBodyError(f"Body is not a valid JSON array: {e}")
+        if not isinstance(rows, list):
+            raise BulkBodyError("Body must be a JSON array of rows")
+
+    if len(rows) > BULK_MAX_ROWS:
+        raise BulkBodyError(f"Batch of {len(rows)} rows exceeds the limit of {BULK_MAX_ROWS}", status_code=413)
+    return rows
+
+
+def validate_rows(target: BulkTarget, raw_rows: List) -> Tuple[List[Tuple[int, Dict]], Dict[int, List[str]]]:
+    """
+    Validate a batch against the target's Create schema
+
+    Returns:
+        tuple: ([(row index, column values)] for valid rows, {row index: [error messages]})
+    """
+    adapter = _adapters.get(target.schema)
+    if adapter is None:
+        adapter = _adapters[target.schema] = TypeAdapter(List[target.schema])
+
+    errors = {}
+    candidates = []
+    for index, row in enumerate(raw_rows):
+        if isinstance(row, _Unparseable):
+            errors[index] = [row.message]
+        else:
+            candidates.append((index, row))
+
+    try:
+        validated = adapter.validate_python([row for _, row in candidates])
+    except ValidationError as e:
+        for error in e.errors():
+            index = candidates[error["loc"][0]][0]
+            field = ".".join(str(part) for part in error["loc"][1:])
+            errors.setdefault(index, []).append(f"{field}: {error['msg']}" if field else error["msg"])
+        # Only rows that passed remain, so the second pass cannot fail
+        candidates = [candidate for candidate in candidates if candidate[0] not in errors]
+        validated = adapter.validate_python([row for _, row in candidates])
+
+    valid = [
+        (index, {column: _value(value) for column, value in model.dict().items()})
+        for (index, _), model in zip(candidates, validated)
+    ]
+    return valid, errors
+
+
+def unknown_item_ids(db, item_ids) -> set:
+    """The item ids that match no inventory item"""
+    item_ids = list(set(item_ids))
+    known = set()
+    for start in range(0, len(item_ids), 500):
+        known.update(db.execute(
+            select(InventoryItem.item_id).where(InventoryItem.item_id.in_(item_ids[start:start + 500]))
+        ).scalars())
+    return set(item_ids) - known
+
+
+def write_rows(db, target: BulkTarget, valid: List[Tuple[int, Dict]], errors: Dict[int, List[str]],
+               atomic: bool = False) -> int:
+    """
+    Insert validated rows with one batched INSERT; the caller commits
+
+    Rows referencing unknown inventory items are moved to errors. With atomic=True
+    nothing is written if any row failed.
+
+    Returns:
+        int: Rows inserted
+    """
+    if target.checks_item and valid:
+        unknown = unknown_item_ids(db, {row["item_id"] for _, row in valid})
+        for index, row in valid:
+            if row["item_id"] in unknown:
+                errors[index] = [f"item_id: unknown inventory item '{row['item_id']}'"]
+        valid = [(index, row) for index, row in valid if index not in errors]
+
+    if not valid or (atomic and errors):
+        return 0
+
+    rows = [row for _, row in valid]
+    # One cached INSERT for the whole batch; SQLAlchemy sends it as an executemany (SQLite) or
+    # as batched multi-row VALUES (Postgres), instead of compiling a statement per chunk
+    db.execute(insert(target.model.__table__), rows)
+
+    if target.record_totals:
+        target.record_totals(db, rows)
+    return len(rows)
+
+
+def bulk_result(received: int, inserted: int, errors: Dict[int, List[str]], started: float) -> Dict:
+    """BulkIngestResult payload"""
+    elapsed = time.perf_counter() - started
+    return {
+        "received": received,
+        "inserted": inserted,
+        "failed": len(errors),
+        "errors": [{"row": index, "errors": messages} for index, messages in sorted(errors.items())],
+        "duration_ms": round(elapsed * 1000, 1),
+        "rows_per_sec": round(inserted / elapsed, 1) if elapsed > 0 else 0.0
+    }
+
+
+def ingest_rows(db, target_name: str, raw_rows: List, atomic: bool = False) -> Dict:
+    """Validate and insert a parsed batch in the caller's transaction; the caller commits"""
+    started = time.perf_counter()
+    target = BULK_TARGETS[target_name]
+    valid, errors = validate_rows(target, raw_rows)
+    inserted = write_rows(db, target, valid, errors, atomic)
+    return bulk_result(len(raw_rows), inserted, errors, started)
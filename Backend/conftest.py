@@ -0,0 +1,50 @@
+"""
+Pytest Configuration for Kopik
+Points every test at a scratch SQLite database, LLM cache, archive and analytics
+snapshot directory. The environment is set when pytest loads this file, before
+any test module imports database.py, and overrides anything already exported,
+so a test can never reset a real database
+"""
+
+import os
+import tempfile
+
+import pytest
+
+_workdir = tempfile.mkdtemp(prefix="kopik_tests_")
+SCRATCH_DATABASE_PATH = os.path.join(_workdir, "kopik_test.db")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{SCRATCH_DATABASE_PATH}"
+os.environ["LLM_CACHE_PATH"] = os.path.join(_workdir, "llm_cache.db")
+os.environ["ARCHIVE_DIR"] = os.path.join(_workdir, "archive")
+os.environ["ANALYTICS_SNAPSHOT_DIR"] = os.path.join(_workdir, "analytics_snapshot")
+
+
+@pytest.fixture
+def scratch_db():
+    """The app's engine, on the scratch database with a freshly migrated schema"""
+    from database import engine
+    from migrations import reset_schema
+
+    if engine.url.get_backend_name() != "sqlite" or os.path.abspath(engine.url.database or "") != SCRATCH_DATABASE_PATH:
+        pytest.fail(f"Refusing to reset {engine.url!r}: it is not the scratch database set up by conftest.py")
+    reset_schema(engine)
+    return engine
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    """A fresh archive directory for archive_store, whichever module imported it first"""
+    import archive_store
+
+    monkeypatch.setattr(archive_store, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    return archive_store.ARCHIVE_DIR
+
+
+@pytest.fixture
+def analytics_snapshot_dir(tmp_path, monkeypatch):
+    """A fresh directory for the columnar analytics snapshot"""
+    import analytics_snapshot
+
+    monkeypatch.setattr(analytics_snapshot, "ANALYTICS_SNAPSHOT_DIR", str(tmp_path / "analytics_snapshot"))
+    return analytics_snapshot.ANALYTICS_SNAPSHOT_DIR
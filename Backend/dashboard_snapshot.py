@@ -0,0 +1,288 @@
+"""
+Materialized Intelligence Dashboard Snapshot for Kopik
+Builds the /api/intelligence/dashboard payload in the background, persists it
+to the dashboard_snapshots table and serves it from memory
+"""
+
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+from database import SessionLocal, DashboardSnapshot as DBDashboardSnapshot
+from llm_fanout import iter_llm_calls
+
+SNAPSHOT_ROW_ID = 1  # a single row is kept and overwritten on every rebuild
+
+
+def render_recommendations(prepared: Dict, explanations: Dict[str, str]) -> List[Dict]:
+    return [
+        {
+            "id": i + 1,
+            "title": solution.get("description", "")[:50] + "..." if len(solution.get("description", "")) > 50 else solution.get("description", ""),
+            "description": solution.get("description", ""),
+            "confidence": round(solution.get("confidence", 80), 1),
+            "profit_impact": round(solution.get("profit_impact", 0), 2),
+            "explanation": explanations.get(str(i)) or f"Recommended: {solution.get('description', 'Take action')}"
+        }
+        for i, solution in enumerate(prepared["top_solutions"])
+    ]
+
+
+def assemble_dashboard(prepared: Dict, results: Dict, fallback_sections: List[str]) -> Dict:
+    """Combine the deterministic sections with the LLM results into the dashboard response"""
+    if prepared.get("llm_error"):
+        llm_features = {"error": prepared["llm_error"]}
+    else:
+        llm_features = {
+            "risk_analysis": results["risk_analysis"],
+            "menu_optimization": results["menu_optimization"]
+        }
+
+    return {
+        "success": True,
+        "timestamp": prepared["timestamp"],
+        "summary": results["summary"],  # LLM-generated business summary
+        "metrics": prepared["metrics"],
+        "llm_features": llm_features,  # Advanced LLM capabilities
+        "alerts": prepared["alerts"],
+        "recommendations": render_recommendations(prepared, results.get("explanations", {})),
+        "data_overview": prepared["data_overview"],
+        "fallback_sections": fallback_sections  # sections served from fallbacks
+    }
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def stream_dashboard_events(engine, snapshot_service: "DashboardSnapshotService") -> Iterator[str]:
+    """
+    Server-Sent Events for the dashboard, emitted as each section becomes available
+
+    Order: metrics (metrics, alerts, recommendations, data_overview) first, then summary,
+    risk_analysis, menu_optimization and explanations as their LLM calls finish, then done.
+    A fresh snapshot is replayed immediately; otherwise a live build is streamed and stored.
+    """
+    snapshot = snapshot_service.fresh_snapshot()
+    if snapshot is not None:
+        payload = snapshot["payload"]
+        yield _sse("metrics", {
+            "timestamp": payload["timestamp"],
+            "metrics": payload["metrics"],
+            "alerts": payload["alerts"],
+            "recommendations": payload["recommendations"],
+            "data_overview": payload["data_overview"]
+        })
+        yield _sse("summary", payload["summary"])
+        llm_features = payload["llm_features"]
+        if "error" in llm_features:
+            yield _sse("llm_error", llm_features["error"])
+        else:
+            yield _sse("risk_analysis", llm_features["risk_analysis"])
+            yield _sse("menu_optimization", llm_features["menu_optimization"])
+            yield _sse("explanations", {str(rec["id"]): rec["explanation"] for rec in payload["recommendations"]})
+        yield _sse("done", {"fallback_sections": payload.get("fallback_sections", []), "snapshot": snapshot_service.describe(snapshot)})
+        return
+
+    generation = snapshot_service.current_generation()
+    started = time.perf_counter()
+    prepared = engine.prepare_dashboard()
+    yield _sse("metrics", {
+        "timestamp": prepared["timestamp"],
+        "metrics": prepared["metrics"],
+        "alerts": prepared["alerts"],
+        "recommendations": render_recommendations(prepared, {}),
+        "data_overview": prepared["data_overview"]
+    })
+
+    calls = engine.dashboard_llm_calls(prepared)
+    if prepared.get("llm_error"):
+        yield _sse("llm_error", prepared["llm_error"])
+
+    results = {}
+    fallback_sections = []
+    for name, result, used_fallback in iter_llm_calls(calls):
+        results[name] = result
+        if used_fallback:
+            fallback_sections.append(name)
+        if name == "explanations":
+            # Keyed by the recommendation ids sent in the metrics event
+            result = {str(rec["id"]): rec["explanation"] for rec in render_recommendations(prepared, result)}
+        yield _sse(name, result)
+
+    payload = assemble_dashboard(prepared, results, fallback_sections)
+    snapshot = snapshot_service.store(payload, (time.perf_counter() - started) * 1000, generation)
+    yield _sse("done", {"fallback_sections": fallback_sections, "snapshot": snapshot_service.describe(snapshot)})
+
+
+class DashboardSnapshotService:
+    """Keeps the latest dashboard payload in memory and in the database, rebuilding it on invalidation"""
+
+    def __init__(self, builder: Optional[Callable[[], Dict]] = None):
+        self.builder = builder  # set by AnalysisEngine.attach at application startup
+        self._lock = threading.Lock()
+        self._store_lock = threading.Lock()  # orders persist + swap so an older build never lands last
+        self._snapshot = None  # {"payload", "built_at", "build_duration_ms", "generation"}
+        self._generation = 0  # bumped on every invalidation
+        self._rebuilding = False
+        self._rebuild_requested = False
+        self.invalidation_count = 0
+        self.last_invalidation_reason = None
+        self.last_error = None
+
+    def get_snapshot(self, refresh: bool = False) -> Dict:
+        """Return the latest snapshot, building synchronously only when none exists yet"""
+        if refresh:
+            return self.rebuild()
+
+        with self._lock:
+            snapshot = self._snapshot
+
+        if snapshot is None:
+            snapshot = self._load_persisted()
+            if snapshot is None:
+                return self.rebuild()
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = snapshot
+            # Anything written while we were down is unknown, so refresh in the background
+            self._schedule_rebuild()
+
+        return snapshot
+
+    def describe(self, snapshot: Dict) -> Dict:
+        """Snapshot freshness metadata attached to every dashboard response"""
+        age_seconds = (datetime.utcnow() - snapshot["built_at"]).total_seconds()
+        with self._lock:
+            stale = snapshot.get("generation") != self._generation
+            rebuilding = self._rebuilding
+        return {
+            "built_at": snapshot["built_at"].isoformat(),
+            "age_seconds": round(max(age_seconds, 0.0), 3),
+            "build_duration_ms": round(snapshot["build_duration_ms"], 1),
+            "stale": stale,
+            "rebuilding": rebuilding
+        }
+
+    def invalidate(self, reason: str = "data changed"):
+        """Mark the snapshot stale and rebuild it in the background"""
+        with self._lock:
+            self._generation += 1
+            self.invalidation_count += 1
+            self.last_invalidation_reason = reason
+        self._schedule_rebuild()
+
+    def rebuild(self) -> Dict:
+        """Build a new snapshot now, persist it and swap it into memory"""
+        # Writes arriving after this point leave the new snapshot stale
+        generation = self.current_generation()
+
+        if self.builder is None:
+            raise RuntimeError("Dashboard builder not attached; the analysis engine has not started")
+
+        started = time.perf_counter()
+        payload = self.builder()
+        return self.store(payload, (time.perf_counter() - started) * 1000, generation)
+
+    def store(self, payload: Dict, build_duration_ms: float, generation: int) -> Dict:
+        """Persist a freshly built payload and make it the served snapshot, unless a newer generation is already held"""
+        # Round-trip through JSON so the in-memory copy matches what is persisted
+        snapshot = {
+            "payload": json.loads(json.dumps(payload, default=str)),
+            "built_at": datetime.utcnow(),
+            "build_duration_ms": build_duration_ms,
+            "generation": generation
+        }
+
+        with self._store_lock:
+            with self._lock:
+                held = self._snapshot
+            if held is not None and held.get("generation") is not None and generation < held["generation"]:
+                # A build that started before the last invalidation finished after a newer one
+                print(f"📸 Discarded dashboard snapshot from generation {generation}; generation {held['generation']} is already held")
+                return held
+
+            self._persist(snapshot)
+            with self._lock:
+                self._snapshot = snapshot
+                self.last_error = None
+
+        print(f"📸 Dashboard snapshot rebuilt in {build_duration_ms:.0f}ms")
+        return snapshot
+
+    def current_generation(self) -> int:
+        """Generation to pass to store() for a build starting now"""
+        with self._lock:
+            return self._generation
+
+    def fresh_snapshot(self) -> Optional[Dict]:
+        """The in-memory snapshot if no write has happened since it was built, else None"""
+        with self._lock:
+            if self._snapshot is not None and self._snapshot.get("generation") == self._generation:
+                return self._snapshot
+        return None
+
+    def _schedule_rebuild(self):
+        with self._lock:
+            if self._rebuilding:
+                # Coalesce bursts of writes into one follow-up rebuild
+                self._rebuild_requested = True
+                return
+            self._rebuilding = True
+
+        threading.Thread(target=self._rebuild_loop, name="dashboard-snapshot", daemon=True).start()
+
+    def _rebuild_loop(self):
+        while True:
+            try:
+                self.rebuild()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"❌ Dashboard snapshot rebuild failed: {e}")
+
+            with self._lock:
+                if not self._rebuild_requested:
+                    self._rebuilding = False
+                    return
+                self._rebuild_requested = False
+
+    def _load_persisted(self) -> Optional[Dict]:
+        db = SessionLocal()
+        try:
+            row = db.query(DBDashboardSnapshot).filter(DBDashboardSnapshot.id == SNAPSHOT_ROW_ID).first()
+            if row is None:
+                return None
+            return {
+                "payload": row.payload,
+                "built_at": row.built_at,
+                "build_duration_ms": row.build_duration_ms,
+                "generation": None  # always stale until rebuilt by this process
+            }
+        except Exception as e:
+            print(f"⚠️ Could not load persisted dashboard snapshot: {e}")
+            return None
+        finally:
+            db.close()
+
+    def _persist(self, snapshot: Dict):
+        db = SessionLocal()
+        try:
+            row = db.query(DBDashboardSnapshot).filter(DBDashboardSnapshot.id == SNAPSHOT_ROW_ID).first()
+            if row is None:
+                row = DBDashboardSnapshot(id=SNAPSHOT_ROW_ID)
+                db.add(row)
+            row.payload = snapshot["payload"]
+            row.built_at = snapshot["built_at"]
+            row.build_duration_ms = snapshot["build_duration_ms"]
+            db.commit()
+        except Exception as e:
+            # The in-memory snapshot is still served; persistence only helps cold starts
+            print(f"⚠️ Could not persist dashboard snapshot: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+# Singleton
+dashboard_snapshots = DashboardSnapshotService()
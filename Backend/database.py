@@ -1,15 +1,20 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Float, Boolean, JSON, Date, ForeignKey
+from sqlalchemy import func, literal_column, text, Column, Integer, String, DateTime, Text, Float, Boolean, JSON, Date, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
 
-SQLITE_DATABASE_URL = "sqlite:///./kopik.db"
+from db_config import DATABASE_URL, create_database_engine, create_snapshot_engine
+from table_versions import TABLE_VERSIONS, track_table_versions
 
-engine = create_engine(
-    SQLITE_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# sqlite:///./kopik.db unless DATABASE_URL is set; see db_config for the SQLite profile and Postgres pool
+engine = create_database_engine(DATABASE_URL)
+track_table_versions(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Read-only sessions for analysis: one consistent snapshot per session, from a pool of their own
+snapshot_engine = create_snapshot_engine(DATABASE_URL) or engine
+SnapshotSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=snapshot_engine)
+
 Base = declarative_base()
 
 class IntelligenceSignal(Base):
@@ -24,6 +29,10 @@ class IntelligenceSignal(Base):
     active_date = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_intelligence_signals_created_at", "created_at"),  # latest signals first
+    )
+
 class InventoryItem(Base):
     __tablename__ = "inventory_items"
 
@@ -45,6 +54,24 @@ class InventoryItem(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # Low stock compares two columns, which no ordinary index can seek; this partial
+        # index holds only the rows that satisfy the comparison, keyed on id so the
+        # below_reorder filter reads it in page order
+        Index(
+            "ix_inventory_items_below_reorder", "id",
+            sqlite_where=text("current_stock <= reorder_point"),
+            postgresql_where=text("current_stock <= reorder_point")
+        ),
+        # Server-side inventory filters and search (see inventory_filters.py)
+        Index("ix_inventory_items_category", "category"),
+        Index("ix_inventory_items_supplier", "supplier"),
+        Index("ix_inventory_items_name_lower", func.lower(name)),
+        Index("ix_inventory_items_sku_lower", func.lower(sku)),
+        # Stock-to-usage ratio (days of stock left); must match inventory_filters.STOCK_RATIO
+        Index("ix_inventory_items_stock_ratio", current_stock / func.nullif(daily_usage, literal_column("0"))),
+    )
+
 class Recommendation(Base):
     __tablename__ = "recommendations"
 
@@ -57,9 +84,19 @@ class Recommendation(Base):
     action_required = Column(Boolean, nullable=True, default=False)
     category = Column(String, nullable=True)
     trigger_sources = Column(JSON, nullable=True)
+    fingerprint = Column(String, nullable=True, unique=True, index=True)  # stable identity used for upserts
+    first_seen_at = Column(DateTime, nullable=True, default=datetime.utcnow)
+    last_seen_at = Column(DateTime, nullable=True, default=datetime.utcnow, index=True)
+    seen_count = Column(Integer, nullable=False, default=1)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_recommendations_priority_category", "priority", "category"),
+        Index("ix_recommendations_category", "category"),
+        {"sqlite_autoincrement": True},  # ids are never reused: the archive keys rows on them
+    )
+
 class FoodWaste(Base):
     __tablename__ = "food_waste"
 
@@ -73,6 +110,11 @@ class FoodWaste(Base):
     prevention_notes = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_food_waste_item_date", "item_id", "waste_date"),
+        {"sqlite_autoincrement": True},  # ids are never reused: the archive keys rows on them
+    )
+
     # Relationship
     inventory_item = relationship("InventoryItem", backref="waste_records")
 
@@ -118,6 +160,12 @@ class Sale(Base):
     time_of_day = Column(String, nullable=True)  # morning, afternoon, evening
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Per-item history and the rollups: covers item_id + date range without touching the table
+        Index("ix_sales_item_date", "item_id", "sale_date", "quantity_sold", "total_amount"),
+        {"sqlite_autoincrement": True},  # ids are never reused: the archive keys rows on them
+    )
+
     # Relationship
     inventory_item = relationship("InventoryItem", backref="sales_records")
 
@@ -138,9 +186,53 @@ class Order(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_orders_status_date", "status", "order_date"),
+    )
+
     # Relationship
     inventory_item = relationship("InventoryItem", backref="order_records")
 
+class DailySalesRollup(Base):
+    __tablename__ = "daily_sales_rollup"  # full sales history per day, updated with every sale insert
+
+    sale_date = Column(Date, primary_key=True)
+    item_id = Column(String, primary_key=True)
+    time_of_day = Column(String, primary_key=True, default="unknown")  # "unknown" when the sale had none
+    customer_type = Column(String, primary_key=True, default="unknown")
+    transactions = Column(Integer, nullable=False, default=0)
+    quantity = Column(Float, nullable=False, default=0.0)
+    revenue = Column(Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        Index("ix_daily_sales_rollup_item_date", "item_id", "sale_date"),  # per-item trends
+    )
+
+class WasteDailyTotal(Base):
+    __tablename__ = "waste_daily_totals"  # running totals, updated with every waste insert
+
+    waste_date = Column(Date, primary_key=True)
+    item_id = Column(String, primary_key=True)
+    reason = Column(String, primary_key=True)
+    records = Column(Integer, nullable=False, default=0)
+    quantity = Column(Float, nullable=False, default=0.0)
+    cost = Column(Float, nullable=False, default=0.0)
+
+class TableVersion(Base):
+    __tablename__ = TABLE_VERSIONS  # change counter per table, bumped by every write (see table_versions.py)
+
+    table_name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class DashboardSnapshot(Base):
+    __tablename__ = "dashboard_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    payload = Column(JSON, nullable=False)  # fully rendered /intelligence/dashboard response
+    built_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    build_duration_ms = Column(Float, nullable=False)
+
 def get_db():
     db = SessionLocal()
     try:
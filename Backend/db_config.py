@@ -0,0 +1,226 @@
+"""
+Database Configuration for Kopik
+Builds the SQLAlchemy engines from DATABASE_URL: SQLite gets a tuned connection
+profile (WAL, synchronous=NORMAL, mmap, cache, busy timeout) applied on every
+connect, Postgres gets a sized connection pool. The async engine uses the same
+settings through aiosqlite or asyncpg, and the read-only snapshot engine gives
+analysis workloads one consistent view per session from a pool of their own
+"""
+
+import os
+from typing import Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+
+load_dotenv()
+
+DEFAULT_DATABASE_URL = "sqlite:///./kopik.db"
+DATABASE_URL = os.getenv('DATABASE_URL', DEFAULT_DATABASE_URL)
+
+# SQLite profile; set SQLITE_PROFILE=default to leave SQLite's own settings untouched
+SQLITE_PROFILE = os.getenv('SQLITE_PROFILE', 'performance')
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE', '-65536'))  # negative = KiB, i.e. 64 MiB
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+SQLITE_TEMP_STORE = os.getenv('SQLITE_TEMP_STORE', 'MEMORY')
+
+# Connection pool for Postgres and file-backed SQLite (WAL lets pooled readers run side by side)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+
+# Worker threads for sync routes and blocking work (anyio's default is 40); the sync
+# engine's pool is grown to at least this many connections so no worker waits on one
+THREADPOOL_SIZE = int(os.getenv('THREADPOOL_SIZE', '40'))
+
+# Separate, smaller pool for the analysis snapshot engine so analysis never takes CRUD connections
+ANALYSIS_POOL_SIZE = int(os.getenv('ANALYSIS_POOL_SIZE', '2'))
+ANALYSIS_MAX_OVERFLOW = int(os.getenv('ANALYSIS_MAX_OVERFLOW', '2'))
+
+
+def sqlite_pragmas(profile: str = SQLITE_PROFILE) -> dict:
+    """PRAGMAs applied to every new SQLite connection for a profile"""
+    if profile == 'default':
+        return {}
+    return {
+        "journal_mode": SQLITE_JOURNAL_MODE,
+        "synchronous": SQLITE_SYNCHRONOUS,
+        "mmap_size": SQLITE_MMAP_SIZE,
+        "cache_size": SQLITE_CACHE_SIZE,
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+        "temp_store": SQLITE_TEMP_STORE
+    }
+
+
+def _apply_sqlite_pragmas(engine: Engine, pragmas: dict):
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def _pool_options() -> dict:
+    return {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT}
+
+
+def _threadpool_pool_options() -> dict:
+    """Pool options for the sync engine, sized to the threadpool that drives it"""
+    options = _pool_options()
+    options["max_overflow"] = max(DB_MAX_OVERFLOW, THREADPOOL_SIZE - DB_POOL_SIZE)
+    return options
+
+
+def create_database_engine(url: str = None, sqlite_profile: str = SQLITE_PROFILE, **kwargs) -> Engine:
+    """
+    Create the engine for a database URL
+
+    Args:
+        url: SQLAlchemy URL; defaults to DATABASE_URL
+        sqlite_profile: 'performance' or 'default' (SQLite only)
+        **kwargs: Extra create_engine arguments
+
+    Returns:
+        Engine: Configured engine
+    """
+    url = url or DATABASE_URL
+    backend = make_url(url).get_backend_name()
+
+    if backend == "sqlite":
+        connect_args = {"check_same_thread": False}
+        pragmas = sqlite_pragmas(sqlite_profile)
+        if pragmas:
+            # The driver waits on a locked database for this long before the busy_timeout PRAGMA applies
+            connect_args["timeout"] = SQLITE_BUSY_TIMEOUT_MS / 1000
+        if sqlite_database_path(url):
+            kwargs = {**_threadpool_pool_options(), **kwargs}
+        engine = create_engine(url, connect_args=connect_args, **kwargs)
+        if pragmas:
+            _apply_sqlite_pragmas(engine, pragmas)
+        return engine
+
+    if backend == "postgresql":
+        pool_options = {**_threadpool_pool_options(), "pool_recycle": DB_POOL_RECYCLE, "pool_pre_ping": True}
+        pool_options.update(kwargs)
+        return create_engine(url, **pool_options)
+
+    return create_engine(url, **kwargs)
+
+
+def create_snapshot_engine(url: str = None, sqlite_profile: str = SQLITE_PROFILE) -> Optional[Engine]:
+    """
+    Create a read-only engine whose sessions each see one consistent snapshot
+
+    SQLite: every transaction is an explicit BEGIN, so all statements of a session
+    read from the same WAL snapshot until it ends, and query_only rejects writes.
+    Postgres: REPEATABLE READ, READ ONLY transactions.
+
+    Args:
+        url: SQLAlchemy URL; defaults to DATABASE_URL
+        sqlite_profile: 'performance' or 'default' (SQLite only)
+
+    Returns:
+        Engine: Configured engine, or None for an in-memory SQLite database, which
+            a second engine could not see (use the main engine instead)
+    """
+    url = url or DATABASE_URL
+    backend = make_url(url).get_backend_name()
+    pool_options = {"pool_size": ANALYSIS_POOL_SIZE, "max_overflow": ANALYSIS_MAX_OVERFLOW}
+
+    if backend == "sqlite":
+        if not sqlite_database_path(url):
+            return None
+        engine = create_database_engine(url, sqlite_profile, **pool_options)
+
+        @event.listens_for(engine, "connect")
+        def read_only(dbapi_connection, connection_record):
+            # Take transaction control away from pysqlite, which never BEGINs before a SELECT
+            dbapi_connection.isolation_level = None
+            dbapi_connection.execute("PRAGMA query_only=ON")
+
+        @event.listens_for(engine, "begin")
+        def begin_snapshot(conn):
+            # The read snapshot is fixed by the first SELECT and held until commit/rollback
+            conn.exec_driver_sql("BEGIN")
+
+        return engine
+
+    if backend == "postgresql":
+        return create_database_engine(
+            url,
+            isolation_level="REPEATABLE READ",
+            execution_options={"postgresql_readonly": True},
+            **pool_options
+        )
+
+    return create_database_engine(url, sqlite_profile, **pool_options)
+
+
+def async_database_url(url: str = None) -> str:
+    """The async-driver form of a database URL (sqlite -> aiosqlite, postgresql -> asyncpg)"""
+    url = make_url(url or DATABASE_URL)
+    backend = url.get_backend_name()
+    if backend == "sqlite" and url.drivername != "sqlite+aiosqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    elif backend == "postgresql" and url.drivername != "postgresql+asyncpg":
+        url = url.set(drivername="postgresql+asyncpg")
+    return url.render_as_string(hide_password=False)
+
+
+def create_async_database_engine(url: str = None, sqlite_profile: str = SQLITE_PROFILE, **kwargs):
+    """
+    Create the AsyncEngine for a database URL; needs aiosqlite (SQLite) or asyncpg (Postgres)
+
+    Args:
+        url: SQLAlchemy URL in sync or async form; defaults to DATABASE_URL
+        sqlite_profile: 'performance' or 'default' (SQLite only)
+        **kwargs: Extra create_async_engine arguments
+
+    Returns:
+        AsyncEngine: Configured engine
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = async_database_url(url)
+    backend = make_url(url).get_backend_name()
+
+    if backend == "sqlite":
+        pragmas = sqlite_pragmas(sqlite_profile)
+        connect_args = {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000} if pragmas else {}
+        if sqlite_database_path(url):
+            kwargs = {**_pool_options(), **kwargs}
+        engine = create_async_engine(url, connect_args=connect_args, **kwargs)
+        if pragmas:
+            _apply_sqlite_pragmas(engine.sync_engine, pragmas)
+        return engine
+
+    if backend == "postgresql":
+        pool_options = {**_pool_options(), "pool_recycle": DB_POOL_RECYCLE, "pool_pre_ping": True}
+        pool_options.update(kwargs)
+        return create_async_engine(url, **pool_options)
+
+    return create_async_engine(url, **kwargs)
+
+
+def async_driver_available(url: str = None) -> bool:
+    """Whether the async driver for a database URL (aiosqlite, asyncpg) is installed"""
+    from importlib.util import find_spec
+
+    driver = make_url(async_database_url(url)).get_driver_name()
+    return find_spec(driver) is not None
+
+
+def sqlite_database_path(url: str = None):
+    """Filesystem path of a SQLite database URL, or None for other backends and in-memory databases"""
+    url = make_url(url or DATABASE_URL)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return None
+    return url.database
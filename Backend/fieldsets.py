@@ -0,0 +1,81 @@
+"""
+Sparse Fieldsets for Kopik List Routes
+A fields= query parameter (comma-separated response model fields, e.g.
+?fields=item_id,name,current_stock) limits both the SQL and the response:
+only those columns (plus the keyset columns the cursor needs) are loaded with
+load_only, and the page is serialized through a trimmed copy of the response
+model, so large JSON columns like weather_sensitivity or details are neither
+read nor sent unless asked for
+"""
+
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, Response
+from pydantic import ConfigDict, TypeAdapter, create_model
+from sqlalchemy.orm import load_only
+
+from pagination import Keyset, page
+
+
+def parse_fields(schema, fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Requested fields in the response model's order, or None for every field
+
+    Raises:
+        HTTPException: 400 naming the unknown fields
+    """
+    if not fields:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(schema.model_fields)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}; available: {', '.join(schema.model_fields)}"
+        )
+    return [field for field in schema.model_fields if field in requested] or None
+
+
+def keyset_fields(keyset: Keyset) -> List[str]:
+    """Columns a page must load even when not requested, to build the next cursor"""
+    columns = [keyset.id_column] if keyset.sort_column is None else [keyset.sort_column, keyset.id_column]
+    return [column.key for column in columns]
+
+
+def load_fields(query, keyset: Keyset, fields: Optional[List[str]]):
+    """Restrict a Query or select() of the keyset's model to the requested columns"""
+    if fields is None:
+        return query
+    model = keyset.id_column.class_
+    names = fields + [name for name in keyset_fields(keyset) if name not in fields]
+    return query.options(load_only(*[getattr(model, name) for name in names]))
+
+
+@lru_cache(maxsize=None)
+def _sparse_adapter(schema, fields: Tuple[str, ...]) -> TypeAdapter:
+    """List adapter for a copy of schema that keeps only fields"""
+    sparse_model = create_model(
+        f"{schema.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **{field: (schema.model_fields[field].annotation, schema.model_fields[field]) for field in fields}
+    )
+    return TypeAdapter(List[sparse_model])
+
+
+def sparse_json(schema, fields: List[str], rows: List) -> bytes:
+    """JSON array of rows serialized through the trimmed response model"""
+    adapter = _sparse_adapter(schema, tuple(fields))
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+
+def fieldset_page(response: Response, rows: List, keyset: Optional[Keyset], limit: int, schema, fields: Optional[List[str]]):
+    """
+    page() for routes taking fields=: the rows as-is when every field was asked
+    for, otherwise a JSON response holding only the requested fields
+    """
+    rows = page(response, rows, keyset, limit)
+    if fields is None:
+        return rows
+    # Unloaded attributes would lazy-load per row under the full response model
+    return Response(content=sparse_json(schema, fields, rows), media_type="application/json", headers=dict(response.headers))
@@ -0,0 +1,112 @@
+"""
+Inventory Filtering, Sorting and Search for Kopik
+Server-side versions of the filters the Inventory page used to apply in the
+browser, each backed by an index on inventory_items:
+
+    category / supplier        equality (comma-separated for several)
+    below_reorder              current_stock <= reorder_point (partial index)
+    min/max_stock_ratio        current_stock / daily_usage, i.e. days of stock left
+    q                          case-insensitive prefix of name or sku
+    sort                       e.g. "category,-stock_ratio,name" (- for descending)
+
+Results in the default order page by cursor as before; a custom sort pages by
+skip/limit
+"""
+
+from typing import List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, func, literal_column, or_
+
+from database import InventoryItem
+
+# Same expression as the ix_inventory_items_stock_ratio index; NULL when daily_usage is 0
+STOCK_RATIO = InventoryItem.current_stock / func.nullif(InventoryItem.daily_usage, literal_column("0"))
+
+SORT_KEYS = {
+    "name": InventoryItem.name,
+    "item_id": InventoryItem.item_id,
+    "sku": InventoryItem.sku,
+    "category": InventoryItem.category,
+    "supplier": InventoryItem.supplier,
+    "current_stock": InventoryItem.current_stock,
+    "daily_usage": InventoryItem.daily_usage,
+    "reorder_point": InventoryItem.reorder_point,
+    "cost_per_unit": InventoryItem.cost_per_unit,
+    "stock_ratio": STOCK_RATIO,
+    "updated_at": InventoryItem.updated_at
+}
+
+
+def _values(param: Optional[str]) -> List[str]:
+    return [value.strip() for value in (param or "").split(",") if value.strip()]
+
+
+def prefix_match(expression, prefix: str):
+    """Case-insensitive prefix test that can seek an index on lower(expression)"""
+    lowered = prefix.lower()
+    # The range lets the index seek; startswith keeps the exact LIKE semantics on any collation
+    upper = lowered[:-1] + chr(ord(lowered[-1]) + 1)
+    lower_expression = func.lower(expression)
+    return and_(
+        lower_expression >= lowered,
+        lower_expression < upper,
+        lower_expression.startswith(lowered, autoescape=True)
+    )
+
+
+def filter_inventory(
+    query,
+    category: Optional[str] = None,
+    supplier: Optional[str] = None,
+    below_reorder: bool = False,
+    min_stock_ratio: Optional[float] = None,
+    max_stock_ratio: Optional[float] = None,
+    q: Optional[str] = None
+):
+    """Apply the inventory filters to a Query or select() of InventoryItem"""
+    categories = _values(category)
+    if categories:
+        query = query.where(InventoryItem.category.in_(categories))
+    suppliers = _values(supplier)
+    if suppliers:
+        query = query.where(InventoryItem.supplier.in_(suppliers))
+    if below_reorder:
+        query = query.where(InventoryItem.current_stock <= InventoryItem.reorder_point)
+    if min_stock_ratio is not None:
+        query = query.where(STOCK_RATIO >= min_stock_ratio)
+    if max_stock_ratio is not None:
+        query = query.where(STOCK_RATIO <= max_stock_ratio)
+    if q and q.strip():
+        query = query.where(or_(prefix_match(InventoryItem.name, q.strip()), prefix_match(InventoryItem.sku, q.strip())))
+    return query
+
+
+def parse_sort(sort: Optional[str]) -> List:
+    """
+    ORDER BY clauses for a sort parameter, with id as the final tie-breaker
+
+    Raises:
+        HTTPException: 400 naming an unknown sort key
+    """
+    keys = _values(sort)
+    if not keys:
+        return []
+    clauses = []
+    for key in keys:
+        descending = key.startswith("-")
+        column = SORT_KEYS.get(key.lstrip("-+"))
+        if column is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown sort key: {key.lstrip('-+')}; available: {', '.join(SORT_KEYS)}"
+            )
+        clauses.append(column.desc() if descending else column.asc())
+    return clauses + [InventoryItem.id.asc()]
+
+
+def sort_inventory(query, order: List, cursor: Optional[str], skip: int, limit: int):
+    """Order by a custom sort and restrict to one page (plus a look-ahead row) by skip/limit"""
+    if cursor:
+        raise HTTPException(status_code=400, detail="cursor paging follows the default order; use skip with sort")
+    return query.order_by(*order).offset(skip).limit(max(limit, 0) + 1)
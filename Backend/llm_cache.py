@@ -0,0 +1,188 @@
+"""
+Persistent LLM Response Cache for Kopik
+Content-addressed SQLite cache shared by every Gemini-backed service, so that
+unchanged business data never costs a second network call
+"""
+
+import dataclasses
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', './llm_cache.db')
+LLM_CACHE_TTL_SECONDS = float(os.getenv('LLM_CACHE_TTL_SECONDS', str(24 * 60 * 60)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '5000'))
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+
+
+def _normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so indentation and trailing blanks do not change the key"""
+    return " ".join(prompt.split())
+
+
+def _normalize_config(generation_config: Any) -> Any:
+    if generation_config is None:
+        return None
+    if dataclasses.is_dataclass(generation_config):
+        generation_config = dataclasses.asdict(generation_config)
+    if isinstance(generation_config, dict):
+        return {k: v for k, v in sorted(generation_config.items()) if v is not None}
+    return repr(generation_config)
+
+
+class LLMResponseCache:
+    """SQLite-backed cache keyed by a hash of model name, generation config and normalized prompt"""
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES, enabled: bool = LLM_CACHE_ENABLED):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._conn = None
+        self._stats = {}  # namespace -> {"hits", "misses", "stores"}
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_last_access ON llm_cache (last_access)")
+            self._conn.commit()
+        return self._conn
+
+    def make_key(self, namespace: str, model_name: str, prompt: str, generation_config: Any = None) -> str:
+        material = json.dumps({
+            "namespace": namespace,
+            "model": model_name,
+            "config": _normalize_config(generation_config),
+            "prompt": _normalize_prompt(prompt)
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _count(self, namespace: str, counter: str):
+        stats = self._stats.setdefault(namespace, {"hits": 0, "misses": 0, "stores": 0})
+        stats[counter] += 1
+
+    def get(self, key: str, namespace: str) -> Optional[str]:
+        with self._lock:
+            try:
+                conn = self._connection()
+                row = conn.execute(
+                    "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                now = time.time()
+                if row is None or now - row[1] > self.ttl_seconds:
+                    self._count(namespace, "misses")
+                    return None
+                conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+                conn.commit()
+                self._count(namespace, "hits")
+                return row[0]
+            except sqlite3.Error as e:
+                print(f"⚠️ LLM cache read failed: {e}")
+                self._count(namespace, "misses")
+                return None
+
+    def set(self, key: str, namespace: str, model_name: str, response: str):
+        with self._lock:
+            try:
+                conn = self._connection()
+                now = time.time()
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, namespace, model, response, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, namespace, model_name, response, now, now)
+                )
+                # Drop expired rows, then the least recently used ones beyond the size limit
+                conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+                conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    "SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+                conn.commit()
+                self._count(namespace, "stores")
+            except sqlite3.Error as e:
+                print(f"⚠️ LLM cache write failed: {e}")
+
+    def generate(self, model, prompt: str, namespace: str, generation_config: Any = None) -> str:
+        """
+        Return the model's text response for a prompt, calling the API only on a cache miss
+
+        Args:
+            model: google.generativeai GenerativeModel
+            prompt: Prompt text
+            namespace: Name of the calling service, e.g. "summary" or "risk"
+            generation_config: Optional generation config passed through to the model
+
+        Returns:
+            str: Response text
+        """
+        model_name = getattr(model, 'model_name', type(model).__name__)
+        if not self.enabled:
+            return self._call(model, prompt, generation_config)
+
+        key = self.make_key(namespace, model_name, prompt, generation_config)
+        cached = self.get(key, namespace)
+        if cached is not None:
+            return cached
+
+        text = self._call(model, prompt, generation_config)
+        self.set(key, namespace, model_name, text)
+        return text
+
+    def _call(self, model, prompt: str, generation_config: Any) -> str:
+        if generation_config is None:
+            return model.generate_content(prompt).text
+        return model.generate_content(prompt, generation_config=generation_config).text
+
+    def clear(self, namespace: Optional[str] = None):
+        with self._lock:
+            conn = self._connection()
+            if namespace:
+                conn.execute("DELETE FROM llm_cache WHERE namespace = ?", (namespace,))
+            else:
+                conn.execute("DELETE FROM llm_cache")
+            conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters per namespace since startup, plus stored entry counts"""
+        with self._lock:
+            namespaces = {ns: dict(counts) for ns, counts in self._stats.items()}
+            try:
+                for ns, entries in self._connection().execute(
+                    "SELECT namespace, COUNT(*) FROM llm_cache GROUP BY namespace"
+                ):
+                    namespaces.setdefault(ns, {"hits": 0, "misses": 0, "stores": 0})["entries"] = entries
+            except sqlite3.Error as e:
+                print(f"⚠️ LLM cache stats failed: {e}")
+
+        for counts in namespaces.values():
+            counts.setdefault("entries", 0)
+            lookups = counts["hits"] + counts["misses"]
+            counts["hit_rate"] = round(counts["hits"] / lookups, 3) if lookups else None
+
+        return {
+            "enabled": self.enabled,
+            "ttl_seconds": self.ttl_seconds,
+            "max_entries": self.max_entries,
+            "namespaces": namespaces
+        }
+
+# Singleton
+llm_cache = LLMResponseCache()
@@ -4,8 +4,11 @@ Generates personalized explanations for each recommendation
 """
 
 import os
+import json
 import google.generativeai as genai
 from dotenv import load_dotenv
+from llm_cache import llm_cache
+from typing import List, Dict
 
 load_dotenv()
 
@@ -56,11 +59,88 @@ Make it urgent, specific, and actionable for busy restaurant operators.
 """
 
         try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            return llm_cache.generate(self.model, prompt, namespace="explanations").strip()
         except Exception as e:
             return f"Smart recommendation: {recommendation.get('description', 'Take action to optimize operations')}"
 
+    def explain_recommendations(self, recommendations: List[dict], context: dict = None) -> Dict[str, str]:
+        """
+        Generate explanations for many recommendations with a single model call
+
+        Args:
+            recommendations: Recommendation dicts; each is keyed by its "id" or, if absent, its list index
+            context: Business context shared by every recommendation
+
+        Returns:
+            dict: Explanation text by recommendation id (as a string); ids the model's
+            response left out are absent, for the caller to explain one by one
+        """
+        keyed = {str(rec.get('id', i)): rec for i, rec in enumerate(recommendations)}
+        if not keyed:
+            return {}
+
+        if not self.model:
+            return {rec_id: self.explain_recommendation(rec, context) for rec_id, rec in keyed.items()}
+
+        prompt = """
+You are a business advisor explaining WHY each of the following recommendations is important for a restaurant/cafe.
+"""
+
+        if context:
+            prompt += f"""
+**Business Context** (shared by all recommendations):
+- Recent Sales: {context.get('recent_sales', 'Unknown')}
+- Upcoming Events: {context.get('upcoming_events', 'None')}
+- Current Season: {context.get('season', 'Unknown')}
+- Weather: {context.get('weather', 'Unknown')}
+"""
+
+        prompt += """
+**Recommendations**:
+"""
+        for rec_id, rec in keyed.items():
+            prompt += f"- [{rec_id}] {rec.get('description', 'Unknown recommendation')} (Confidence: {rec.get('confidence', 'Unknown')}%, Profit Impact: ${rec.get('profit_impact', 0):.0f}, Priority: {rec.get('priority', 'medium')}, Category: {rec.get('category', 'general')})\n"
+
+        prompt += """
+For EACH recommendation, generate a 1-2 sentence explanation that answers:
+1. WHY this action is needed right now
+2. WHAT happens if they don't act
+3. HOW it impacts their bottom line
+
+Make it urgent, specific, and actionable for busy restaurant operators.
+
+**REQUIRED: Return ONLY a JSON object mapping each bracketed id to its explanation:**
+
+{"<id>": "<explanation>"}
+"""
+
+        explanations = {}
+        try:
+            explanations_text = llm_cache.generate(
+                self.model,
+                prompt,
+                namespace="explanations",
+                generation_config=genai.types.GenerationConfig(response_mime_type="application/json")
+            ).strip()
+
+            # Remove any markdown formatting
+            if "```json" in explanations_text:
+                explanations_text = explanations_text.split("```json")[1].split("```")[0].strip()
+            elif "```" in explanations_text:
+                explanations_text = explanations_text.split("```")[1].split("```")[0].strip()
+
+            parsed = json.loads(explanations_text)
+            if isinstance(parsed, dict):
+                explanations = {
+                    str(rec_id).strip("[]"): text.strip()
+                    for rec_id, text in parsed.items()
+                    if isinstance(text, str) and text.strip()
+                }
+        except Exception as e:
+            print(f"⚠️ Batch explanation failed: {e}")
+
+        return {rec_id: text for rec_id, text in explanations.items() if rec_id in keyed}
+
     def explain_alert(self, alert: dict, impact: str = "business operations") -> str:
         """Generate explanation for alerts"""
         if not self.model:
@@ -77,8 +157,7 @@ Focus on immediate action needed and business impact. Be urgent but not alarmist
 """
 
         try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            return llm_cache.generate(self.model, prompt, namespace="explanations").strip()
         except Exception as e:
             return alert.get('message', 'Attention required')
 
@@ -0,0 +1,160 @@
+"""
+Concurrent LLM Fan-out for Kopik
+Runs independent Gemini calls on a bounded thread pool, each with its own
+deadline, and substitutes fallbacks for calls that fail or run too long
+
+A call's deadline starts when a worker picks it up, so calls queued behind a
+full pool are not charged for the wait; a call that cannot get a worker within
+LLM_QUEUE_TIMEOUT_SECONDS is cancelled and falls back instead
+
+A call whose result is a dict can name a fill: further calls for the keys that
+result is missing, run in the same fan-out as everything else and merged into
+the dict before it is yielded
+"""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+LLM_CALL_TIMEOUT_SECONDS = float(os.getenv('LLM_CALL_TIMEOUT_SECONDS', '20'))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv('LLM_QUEUE_TIMEOUT_SECONDS', str(LLM_CALL_TIMEOUT_SECONDS)))
+
+_START_POLL_SECONDS = 0.05  # how soon a deadline is noticed for a call that starts mid-wait
+
+# Shared so that calls abandoned after their deadline never block a later build
+_executor = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="llm-call")
+
+
+class LLMCall(NamedTuple):
+    """One independent LLM call and what to use if it does not finish in time"""
+    fn: Callable[[], Any]
+    fallback: Callable[[], Any]
+    timeout: Optional[float] = None  # seconds from when the call starts running; defaults to LLM_CALL_TIMEOUT_SECONDS
+    fill: Optional[Callable[[Dict], Dict[str, "LLMCall"]]] = None  # given the dict result, calls for its missing keys
+
+
+def _label(call_name) -> str:
+    return f"{call_name[0]}[{call_name[1]}]" if isinstance(call_name, tuple) else call_name
+
+
+def iter_llm_calls(calls: Dict[str, LLMCall]) -> Iterator[Tuple[str, Any, bool]]:
+    """
+    Run all calls concurrently and yield each result as soon as it is ready
+
+    Args:
+        calls: Mapping of result name to LLMCall
+
+    Yields:
+        tuple: (name, result, degraded) in completion order; degraded is True when the
+        fallback was used because the call timed out or failed. A call with a fill is
+        yielded once its fill calls have finished, degraded if any of them fell back
+    """
+    started = {}  # call -> when a worker picked it up
+    submitted = {}  # call -> when it was queued
+    futures = {}  # future -> call; fill calls are keyed (name, missing key)
+    filling = {}  # name -> [result being filled, outstanding fill calls, degraded]
+    calls = dict(calls)
+
+    def run(call_name, fn: Callable[[], Any]) -> Any:
+        started[call_name] = time.monotonic()
+        return fn()
+
+    def submit(call_name, call: LLMCall):
+        calls[call_name] = call
+        submitted[call_name] = time.monotonic()
+        futures[_executor.submit(run, call_name, call.fn)] = call_name
+
+    def deadline(call_name) -> float:
+        if call_name in started:
+            timeout = calls[call_name].timeout
+            return started[call_name] + (timeout if timeout is not None else LLM_CALL_TIMEOUT_SECONDS)
+        return submitted[call_name] + LLM_QUEUE_TIMEOUT_SECONDS  # still waiting for a worker
+
+    def finished(call_name, result, degraded: bool) -> List[Tuple[str, Any, bool]]:
+        """Results ready to yield now that call_name has finished"""
+        if isinstance(call_name, tuple):
+            name, key = call_name
+            state = filling[name]
+            if result is not None:
+                state[0][key] = result
+            state[1].discard(call_name)
+            state[2] = state[2] or degraded
+            if state[1]:
+                return []
+            del filling[name]
+            return [(name, state[0], state[2])]
+
+        fill = calls[call_name].fill
+        missing = {}
+        if fill is not None and not degraded:
+            try:
+                missing = fill(result)
+            except Exception as e:
+                print(f"⚠️ Filling LLM call '{call_name}' failed: {e}")
+        if not missing:
+            return [(call_name, result, degraded)]
+
+        filling[call_name] = [dict(result), {(call_name, key) for key in missing}, False]
+        for key, call in missing.items():
+            submit((call_name, key), call)
+        return []
+
+    for name, call in calls.items():
+        submit(name, call)
+
+    while futures:
+        pending = set(futures)
+        next_deadline = min(deadline(futures[future]) for future in pending)
+        timeout = max(next_deadline - time.monotonic(), 0)
+        if any(futures[future] not in started for future in pending):
+            timeout = min(timeout, _START_POLL_SECONDS)
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+        ready = []
+        for future in done:
+            call_name = futures.pop(future)
+            try:
+                ready += finished(call_name, future.result(), False)
+            except Exception as e:
+                print(f"⚠️ LLM call '{_label(call_name)}' failed, using fallback: {e}")
+                ready += finished(call_name, calls[call_name].fallback(), True)
+
+        now = time.monotonic()
+        for future in list(futures):
+            call_name = futures[future]
+            if deadline(call_name) > now:
+                continue
+            if call_name in started:
+                print(f"⏱️ LLM call '{_label(call_name)}' exceeded its deadline, using fallback")
+            elif future.cancel():
+                print(f"⏱️ LLM call '{_label(call_name)}' never got a worker, using fallback")
+            else:
+                # Picked up just now but run() has not recorded it yet; its own deadline applies from here
+                started.setdefault(call_name, now)
+                continue
+            del futures[future]
+            ready += finished(call_name, calls[call_name].fallback(), True)
+
+        yield from ready
+
+
+def gather_llm_calls(calls: Dict[str, LLMCall]) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Run all calls concurrently and collect their results
+
+    Args:
+        calls: Mapping of result name to LLMCall
+
+    Returns:
+        tuple: (results by name, names of calls that timed out or failed)
+    """
+    results = {}
+    degraded = []
+    for name, result, used_fallback in iter_llm_calls(calls):
+        results[name] = result
+        if used_fallback:
+            degraded.append(name)
+
+    return results, degraded
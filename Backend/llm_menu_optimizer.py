@@ -6,6 +6,7 @@ Generates intelligent menu suggestions based on waste, sales, weather, and event
 import os
 import google.generativeai as genai
 from dotenv import load_dotenv
+from llm_cache import llm_cache
 from typing import List, Dict
 
 load_dotenv()
@@ -28,8 +29,9 @@ class LLMMenuOptimizer:
 
         # Prepare comprehensive business context
         inventory_items = business_data.get('inventory', [])
-        waste_data = business_data.get('food_waste', [])
-        sales_data = business_data.get('sales', [])
+        waste_summary = business_data.get('food_waste', {})
+        waste_by_item = waste_summary.get('by_item', {})  # costliest first
+        sales_summary = business_data.get('sales', {})
         events_data = business_data.get('events', [])
         weather_data = business_data.get('weather', [])
 
@@ -40,17 +42,19 @@ You are a culinary business consultant for a restaurant/cafe. Provide structured
 **BUSINESS INTELLIGENCE DATA:**
 
 🗑️ **Food Waste Analysis:**
-- Total waste incidents: {len(waste_data)}
-- High-waste items: {', '.join([w.item_id for w in waste_data[:3]]) if waste_data else 'None'}
-- Total waste cost: ${sum(w.cost_impact for w in waste_data):.0f}
+- Total waste incidents: {waste_summary.get('records', 0)}
+- High-waste items: {', '.join(list(waste_by_item)[:3]) if waste_by_item else 'None'}
+- Total waste cost: ${waste_summary.get('total_cost', 0):.0f}
 
 📦 **Inventory Challenges:**
 - Low stock items: {', '.join([item.name for item in inventory_items[:3]]) if inventory_items else 'None'}
 - Critical shortages: {len([item for item in inventory_items if item.current_stock <= 2])}
 
 💰 **Sales Performance:**
-- Top selling patterns: {len(sales_data)} recent transactions
-- Revenue performance: {'Strong' if len(sales_data) > 40 else 'Moderate'}
+- Top selling patterns: {sales_summary.get('transactions', 0)} recent transactions
+- Revenue performance: {'Strong' if sales_summary.get('transactions', 0) > 40 else 'Moderate'}
+- Busiest times of day: {', '.join(list(sales_summary.get('by_time_of_day', {}))[:2]) or 'Unknown'}
+- Main customer types: {', '.join(list(sales_summary.get('by_customer_type', {}))[:2]) or 'Unknown'}
 
 🎉 **Upcoming Events (Next 14 Days):**
 - Major events: {', '.join([event.name for event in events_data[:2]]) if events_data else 'None'}
@@ -102,8 +106,7 @@ Focus on 3-5 realistic menu items. Return ONLY the JSON, no other text or format
 """
 
         try:
-            response = self.model.generate_content(prompt)
-            menu_analysis = response.text.strip()
+            menu_analysis = llm_cache.generate(self.model, prompt, namespace="menu").strip()
 
             # Clean up the response and try to parse JSON
             # Remove any markdown formatting
@@ -170,8 +173,7 @@ Format: "[Special Name] - [Brief description] - $[Price]"
 """
 
         try:
-            response = self.model.generate_content(prompt)
-            specials = response.text.strip().split('\n')
+            specials = llm_cache.generate(self.model, prompt, namespace="menu").strip().split('\n')
             return [special.strip() for special in specials if special.strip()][:3]
         except:
             return ["Today's Special: Market-fresh selection based on seasonal availability"]
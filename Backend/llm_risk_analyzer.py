@@ -6,6 +6,7 @@ Identifies hidden patterns, risks, and opportunities across all business data
 import os
 import google.generativeai as genai
 from dotenv import load_dotenv
+from llm_cache import llm_cache
 from typing import List, Dict
 
 load_dotenv()
@@ -37,16 +38,17 @@ You are a senior business consultant analyzing a restaurant's operational data.
 - Critical items: {', '.join([item.name for item in comprehensive_data.get('inventory', [])[:3]])}
 
 🗑️ **Food Waste Patterns:**
-- {len(comprehensive_data.get('food_waste', []))} waste incidents in recent period
-- Total waste cost impact: ${sum(waste.cost_impact for waste in comprehensive_data.get('food_waste', [])):.0f}
+- {comprehensive_data.get('food_waste', {}).get('records', 0)} waste incidents in recent period
+- Total waste cost impact: ${comprehensive_data.get('food_waste', {}).get('total_cost', 0):.0f}
 
 🎉 **Upcoming Events:**
 - {len(comprehensive_data.get('events', []))} events in next 2 weeks
 - Major events: {', '.join([event.name for event in comprehensive_data.get('events', [])[:2]])}
 
 💰 **Sales Performance:**
-- {len(comprehensive_data.get('sales', []))} recent transactions
-- Revenue trend: {'Increasing' if len(comprehensive_data.get('sales', [])) > 30 else 'Moderate'}
+- {comprehensive_data.get('sales', {}).get('transactions', 0)} recent transactions
+- Revenue trend: {'Increasing' if comprehensive_data.get('sales', {}).get('transactions', 0) > 30 else 'Moderate'}
+- Busiest times of day: {', '.join(list(comprehensive_data.get('sales', {}).get('by_time_of_day', {}))[:2]) or 'Unknown'}
 
 📦 **Supply Chain:**
 - {len(comprehensive_data.get('orders', []))} pending/delayed orders
@@ -94,8 +96,7 @@ Return ONLY the JSON, no other text or formatting.
 """
 
         try:
-            response = self.model.generate_content(prompt)
-            analysis_text = response.text.strip()
+            analysis_text = llm_cache.generate(self.model, prompt, namespace="risk").strip()
 
             # Clean up the response and try to parse JSON
             # Remove any markdown formatting
@@ -158,8 +159,7 @@ Format: "Opportunity: [Description] - Est. Impact: $[Amount]"
 """
 
         try:
-            response = self.model.generate_content(prompt)
-            opportunities = response.text.strip().split('\n')
+            opportunities = llm_cache.generate(self.model, prompt, namespace="risk").strip().split('\n')
             return [opp.strip() for opp in opportunities if opp.strip()][:3]
         except:
             return ["Advanced seasonal analysis unavailable"]
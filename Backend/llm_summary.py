@@ -7,6 +7,7 @@ import os
 from typing import List, Dict, Any
 import google.generativeai as genai
 from dotenv import load_dotenv
+from llm_cache import llm_cache
 
 # Load environment variables
 load_dotenv()
@@ -66,8 +67,10 @@ CRITICAL: Return ONLY clean plain text without any markdown formatting, headers,
 {prompt}"""
 
             # Generate content with Gemini
-            response = self.model.generate_content(
+            response_text = llm_cache.generate(
+                self.model,
                 full_prompt,
+                namespace="summary",
                 generation_config=genai.types.GenerationConfig(
                     max_output_tokens=300,
                     temperature=0.3  # Low temperature for consistent, factual summaries
@@ -75,7 +78,7 @@ CRITICAL: Return ONLY clean plain text without any markdown formatting, headers,
             )
 
             # Clean the response to ensure no formatting remains
-            clean_text = response.text.strip()
+            clean_text = response_text.strip()
 
             # Remove common markdown formatting patterns
             clean_text = clean_text.replace('**', '')  # Remove bold formatting
@@ -1,16 +1,37 @@
+from contextlib import asynccontextmanager
+import anyio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from database import engine, Base
-from routes import router
+from analysis_engine import AnalysisEngine
+from analysis_trigger import analysis_trigger
+from dashboard_snapshot import dashboard_snapshots
+from migrations import apply_migrations
+from pagination import NEXT_CURSOR_HEADER
 import os
 from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
-Base.metadata.create_all(bind=engine)
+from api_stack import API_STACK
+from db_config import THREADPOOL_SIZE
+from routes import router
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The sync engine's pool is sized to this many workers (see db_config)
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    # Only compares schema versions unless a migration is pending
+    apply_migrations()
+    # One analysis engine per process, shared by every intelligence route
+    app.state.analysis_engine = AnalysisEngine()
+    app.state.analysis_engine.attach(dashboard_snapshots, analysis_trigger)
+    yield
+    if API_STACK == "async":
+        from async_database import async_engine
+        await async_engine.dispose()
 
-app = FastAPI(title="Kopik API", version="1.0.0")
+app = FastAPI(title="Kopik API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,6 +39,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Keyset pagination hands out the next page's cursor in a header; conditional GETs use the validators
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Last-Modified"],
 )
 
 app.include_router(router, prefix="/api")
@@ -28,7 +51,7 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "message": "Kopik API is running"}
+    return {"status": "healthy", "message": "Kopik API is running", "api_stack": API_STACK}
 
 # Legacy endpoint removed - now using /api/intelligence/dashboard directly
 
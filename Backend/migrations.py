@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Schema Migrations for Kopik
+An ordered list of versioned migrations recorded in a schema_version table.
+Startup reads the current version and applies only the migrations above it, so
+a live database gains new tables, columns and indexes without losing data and
+an up-to-date one costs a single query
+
+Each migration runs in its own transaction and must be safe to run against a
+database that already has its changes (fresh databases get the whole current
+schema from the baseline)
+
+Usage:
+    python migrations.py            # apply pending migrations
+    python migrations.py --status   # show the current and latest version
+"""
+
+import argparse
+from datetime import datetime
+from typing import Callable, List, NamedTuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+from database import Base, engine, TableVersion
+from table_versions import SKIP_TABLE_VERSIONS
+
+SCHEMA_VERSION_TABLE = "schema_version"
+
+# Serializes concurrent migrators (several workers starting at once) on Postgres
+_PG_LOCK_KEY = 7315402
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable  # apply(conn)
+
+
+def _baseline(conn):
+    """Every table and index declared in database.py that does not exist yet"""
+    Base.metadata.create_all(bind=conn)
+
+
+def _recommendation_fingerprints(conn):
+    """Fingerprint/first-seen/last-seen columns for recommendations tables created before them"""
+    from recommendation_store import compact_recommendations
+
+    columns = {column["name"] for column in inspect(conn).get_columns("recommendations")}
+    statements = []
+    if "fingerprint" not in columns:
+        statements.append("ALTER TABLE recommendations ADD COLUMN fingerprint VARCHAR")
+    if "first_seen_at" not in columns:
+        statements.append("ALTER TABLE recommendations ADD COLUMN first_seen_at DATETIME")
+    if "last_seen_at" not in columns:
+        statements.append("ALTER TABLE recommendations ADD COLUMN last_seen_at DATETIME")
+    if "seen_count" not in columns:
+        statements.append("ALTER TABLE recommendations ADD COLUMN seen_count INTEGER NOT NULL DEFAULT 1")
+    for statement in statements:
+        conn.execute(text(statement))
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_recommendations_fingerprint ON recommendations (fingerprint)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_recommendations_last_seen_at ON recommendations (last_seen_at)"))
+
+    if statements:
+        # Existing rows get fingerprints and duplicates are merged before upserts rely on them
+        db = Session(bind=conn)
+        result = compact_recommendations(db)
+        db.flush()
+        print(f"🔧 Fingerprinted recommendations: {result['fingerprinted']} kept, {result['merged']} merged")
+
+
+def _index_names(conn, table_name: str) -> set:
+    """Every index on a table, including expression indexes, which reflection skips"""
+    if conn.dialect.name == "postgresql":
+        sql = "SELECT indexname FROM pg_indexes WHERE tablename = :t"
+    else:
+        sql = "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :t"
+    return set(conn.execute(text(sql), {"t": table_name}).scalars())
+
+
+def _declared_indexes(conn):
+    """Indexes declared on the models that tables created before them lack; then refresh planner statistics"""
+    created = 0
+    for table in Base.metadata.sorted_tables:
+        existing = _index_names(conn, table.name)
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=conn)
+                print(f"🗂️ Created index {index.name} on {table.name}")
+                created += 1
+    if created:
+        conn.execute(text("ANALYZE"))
+
+
+def _daily_sales_rollup(conn):
+    """The rollup supersedes sales_daily_totals; backfill it (and empty waste totals) from raw data"""
+    from running_aggregates import backfill_sales_rollup, rebuild_running_aggregates
+    from database import Sale, FoodWaste, DailySalesRollup, WasteDailyTotal
+
+    conn.execute(text("DROP TABLE IF EXISTS sales_daily_totals"))
+    db = Session(bind=conn)
+    if db.query(FoodWaste.id).first() and not db.query(WasteDailyTotal.waste_date).first():
+        rebuild_running_aggregates(db)
+    elif db.query(Sale.id).first() and not db.query(DailySalesRollup.sale_date).first():
+        print(f"📊 Backfilled daily sales rollup: {backfill_sales_rollup(db)} rows")
+    db.flush()
+
+
+def _table_versions(conn):
+    """Per-table change counters behind ETag / conditional GET"""
+    TableVersion.__table__.create(bind=conn, checkfirst=True)
+
+
+def _inventory_filter_indexes(conn):
+    """Filter/search indexes for inventory; the low-stock partial index is re-keyed on id"""
+    conn.execute(text("DROP INDEX IF EXISTS ix_inventory_items_low_stock"))
+    _declared_indexes(conn)
+
+
+def _search_indexes(conn):
+    """FTS5 tables and sync triggers behind /api/search (SQLite only; elsewhere search uses LIKE)"""
+    from search_index import create_search_indexes, fts5_available
+
+    if fts5_available(conn):
+        create_search_indexes(conn)
+    else:
+        print(f"⚠️ No FTS5 on {conn.dialect.name}; /api/search will fall back to LIKE matching")
+
+
+def _never_reuse_archived_ids(conn):
+    """
+    Rebuild sales, food_waste and recommendations with AUTOINCREMENT (SQLite only)
+
+    Without it SQLite hands out max(id) + 1, so an id freed by archival comes back
+    and the new row would overwrite the archived one. The id sequence starts above
+    every id already in the archive. Postgres sequences never reuse ids.
+    """
+    if conn.dialect.name != "sqlite":
+        return
+    from archive_store import ARCHIVE_TABLES, max_archived_id
+    from search_index import create_search_indexes, fts5_available
+
+    rebuilt = 0
+    for name, archived in ARCHIVE_TABLES.items():
+        table = archived.model.__table__
+        sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :t"), {"t": name}).scalar()
+        if sql is None or "AUTOINCREMENT" in sql.upper():
+            continue
+        # Indexes and triggers move with a renamed table; drop the indexes so the new table can take their names
+        old_columns = {column["name"] for column in inspect(conn).get_columns(name)}
+        conn.exec_driver_sql(f"ALTER TABLE {name} RENAME TO {name}__old")
+        for index_name in conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :t AND sql IS NOT NULL"
+        ), {"t": f"{name}__old"}).scalars().all():
+            conn.exec_driver_sql(f'DROP INDEX "{index_name}"')
+        table.create(bind=conn)
+        columns = ", ".join(column.name for column in table.columns if column.name in old_columns)
+        conn.exec_driver_sql(f"INSERT INTO {name} ({columns}) SELECT {columns} FROM {name}__old")
+        conn.exec_driver_sql(f"DROP TABLE {name}__old")
+
+        floor = max_archived_id(name)
+        seq = conn.execute(text("SELECT seq FROM sqlite_sequence WHERE name = :t"), {"t": name}).scalar()
+        if seq is None:
+            conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:t, :s)"), {"t": name, "s": floor})
+        elif seq < floor:
+            conn.execute(text("UPDATE sqlite_sequence SET seq = :s WHERE name = :t"), {"t": name, "s": floor})
+        print(f"🔧 Rebuilt {name} with AUTOINCREMENT; new ids start above {max(seq or 0, floor)}")
+        rebuilt += 1
+
+    # The search triggers on recommendations were dropped with the old table
+    if rebuilt and fts5_available(conn):
+        create_search_indexes(conn)
+
+
+def _refingerprint_recommendations(conn):
+    """Recompute fingerprints that masked every number, which merged e.g. "item 1" and "item 2" """
+    from recommendation_store import fingerprint_recommendations
+
+    conn.execute(text("UPDATE recommendations SET fingerprint = NULL"))
+    db = Session(bind=conn)
+    fingerprinted, merged = fingerprint_recommendations(db)
+    db.flush()
+    print(f"🔧 Re-fingerprinted recommendations: {fingerprinted} kept, {merged} merged")
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline schema", _baseline),
+    Migration(2, "recommendation fingerprints", _recommendation_fingerprints),
+    Migration(3, "composite indexes for hot query shapes", _declared_indexes),
+    Migration(4, "daily sales rollup replaces sales_daily_totals", _daily_sales_rollup),
+    Migration(5, "table change versions", _table_versions),
+    Migration(6, "inventory filter, search and stock ratio indexes", _inventory_filter_indexes),
+    Migration(7, "full-text search indexes", _search_indexes),
+    Migration(8, "never reuse ids of archived tables", _never_reuse_archived_ids),
+    Migration(9, "fingerprints mask only amounts", _refingerprint_recommendations),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def _ensure_version_table(conn):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} ("
+        "version INTEGER PRIMARY KEY, description VARCHAR NOT NULL, applied_at TIMESTAMP NOT NULL)"
+    ))
+
+
+def current_version(conn) -> int:
+    """Highest applied migration, 0 for a database that has never been migrated"""
+    if not inspect(conn).has_table(SCHEMA_VERSION_TABLE):
+        return 0
+    return conn.execute(text(f"SELECT COALESCE(MAX(version), 0) FROM {SCHEMA_VERSION_TABLE}")).scalar()
+
+
+def _lock(conn):
+    """Take the database-wide write lock before re-reading the version"""
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _PG_LOCK_KEY})
+    elif conn.dialect.name == "sqlite":
+        # pysqlite defers BEGIN until the first write; take the write lock up front instead
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def apply_migrations(bind=engine) -> int:
+    """
+    Bring the schema up to LATEST_VERSION
+
+    Returns:
+        int: Number of migrations applied (0 when already current)
+    """
+    with bind.connect() as conn:
+        version = current_version(conn)
+        conn.rollback()
+    if version >= LATEST_VERSION:
+        return 0
+
+    applied = 0
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+        # Writes here are not version-tracked: the table_versions table may not exist yet
+        with bind.connect().execution_options(**{SKIP_TABLE_VERSIONS: True}) as conn:
+            _lock(conn)
+            _ensure_version_table(conn)
+            # Another process may have applied it while we waited for the lock
+            if current_version(conn) >= migration.version:
+                conn.rollback()
+                continue
+            migration.apply(conn)
+            conn.execute(
+                text(f"INSERT INTO {SCHEMA_VERSION_TABLE} (version, description, applied_at) VALUES (:v, :d, :t)"),
+                {"v": migration.version, "d": migration.description, "t": datetime.utcnow()}
+            )
+            conn.commit()
+        applied += 1
+        print(f"🧱 Applied migration {migration.version}: {migration.description}")
+    return applied
+
+
+def reset_schema(bind=engine) -> int:
+    """Drop every table (and the version history) and migrate an empty database to the latest version"""
+    from search_index import drop_search_indexes
+
+    Base.metadata.drop_all(bind=bind)
+    with bind.begin() as conn:
+        drop_search_indexes(conn)
+        conn.execute(text(f"DROP TABLE IF EXISTS {SCHEMA_VERSION_TABLE}"))
+    return apply_migrations(bind)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--status", action="store_true", help="only report the schema version")
+    args = parser.parse_args()
+
+    if args.status:
+        with engine.connect() as conn:
+            print(f"Schema version {current_version(conn)} of {LATEST_VERSION}")
+    else:
+        print(f"{apply_migrations()} migrations applied; schema at version {LATEST_VERSION}")
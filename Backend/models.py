@@ -163,6 +163,9 @@ class RecommendationCreate(RecommendationBase):
 
 class Recommendation(RecommendationBase):
     id: int
+    first_seen_at: Optional[datetime] = None
+    last_seen_at: Optional[datetime] = None
+    seen_count: int = 1
     created_at: datetime
     updated_at: datetime
 
@@ -252,6 +255,18 @@ class Sale(SaleBase):
     class Config:
         from_attributes = True
 
+class SalesDailyRollup(BaseModel):
+    sale_date: date
+    item_id: str
+    time_of_day: str  # "unknown" when the sales had none
+    customer_type: str
+    transactions: int
+    quantity: float
+    revenue: float
+
+    class Config:
+        from_attributes = True
+
 # Order Models
 class OrderBase(BaseModel):
     order_date: date
@@ -284,4 +299,31 @@ class Order(OrderBase):
     updated_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Bulk Ingestion Models
+class BulkRowError(BaseModel):
+    row: int  # 0-based position in the submitted array / NDJSON lines
+    errors: List[str]
+
+class BulkIngestResult(BaseModel):
+    received: int
+    inserted: int
+    failed: int
+    errors: List[BulkRowError] = []
+    duration_ms: float
+    rows_per_sec: float
+
+# Search Models
+class SearchHit(BaseModel):
+    type: str  # search_index.SEARCH_INDEXES key: inventory, recommendations or signals
+    id: int
+    key: Optional[str] = None  # item_id for inventory hits
+    title: str  # HTML-escaped, matched terms wrapped in <mark>
+    snippet: Optional[str] = None  # excerpt of the description, marked up the same way
+    score: float  # bm25 rank, lower is better (0 when ranking is unavailable)
+
+class SearchResults(BaseModel):
+    query: str
+    hits: List[SearchHit]
+    duration_ms: float
@@ -0,0 +1,102 @@
+"""
+Keyset Pagination for Kopik
+List routes page by an opaque cursor holding the last row's (sort key, id) and
+filter with an indexed range predicate, so page N costs the same as page 1.
+The cursor for the next page is returned in the X-Next-Cursor header, leaving
+response bodies as plain arrays
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, List, NamedTuple, Optional
+
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+
+from database import (
+    IntelligenceSignal, InventoryItem, Recommendation, FoodWaste, Weather, Event, Sale, Order
+)
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class Keyset(NamedTuple):
+    """Sort order of a list route: an optional sort column with the primary key as tie-breaker"""
+    id_column: Any
+    sort_column: Any = None
+    descending: bool = False
+
+
+# Each keyset keeps the order its route returned before cursors, so skip/limit clients see the same pages
+SIGNALS_PAGE = Keyset(IntelligenceSignal.id)
+INVENTORY_PAGE = Keyset(InventoryItem.id)
+RECOMMENDATIONS_PAGE = Keyset(Recommendation.id)
+EVENTS_PAGE = Keyset(Event.id)
+FOOD_WASTE_PAGE = Keyset(FoodWaste.id)
+WEATHER_PAGE = Keyset(Weather.id, Weather.date, descending=True)
+SALES_PAGE = Keyset(Sale.id, Sale.sale_date, descending=True)
+ORDERS_PAGE = Keyset(Order.id, Order.order_date, descending=True)
+
+
+def encode_cursor(keyset: Keyset, row) -> str:
+    """Opaque cursor pointing just past row"""
+    values = [getattr(row, keyset.id_column.key)]
+    if keyset.sort_column is not None:
+        sort_value = getattr(row, keyset.sort_column.key)
+        values.insert(0, sort_value.isoformat() if isinstance(sort_value, (date, datetime)) else sort_value)
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(keyset: Keyset, cursor: str) -> List:
+    """Values of a cursor produced by encode_cursor for the same keyset"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        expected = 1 if keyset.sort_column is None else 2
+        if not isinstance(values, list) or len(values) != expected:
+            raise ValueError("wrong shape")
+        values[-1] = int(values[-1])
+        if keyset.sort_column is not None and values[0] is not None:
+            python_type = keyset.sort_column.type.python_type
+            if python_type in (date, datetime):
+                values[0] = python_type.fromisoformat(values[0])
+        return values
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def paginate(query, keyset: Keyset, cursor: Optional[str], skip: int, limit: int):
+    """
+    Order a Query or select() by the keyset and restrict it to one page
+
+    A cursor takes precedence over skip; skip still works for existing clients
+    but costs a scan of the skipped rows.
+    """
+    columns = [keyset.id_column] if keyset.sort_column is None else [keyset.sort_column, keyset.id_column]
+    query = query.order_by(*[column.desc() if keyset.descending else column.asc() for column in columns])
+
+    if cursor:
+        values = decode_cursor(keyset, cursor)
+        if len(columns) == 1:
+            predicate = columns[0] < values[0] if keyset.descending else columns[0] > values[0]
+        else:
+            # Row-value comparison lets SQLite/Postgres seek the (sort column, id) index directly
+            predicate = tuple_(*columns) < tuple_(*values) if keyset.descending else tuple_(*columns) > tuple_(*values)
+        query = query.where(predicate)
+    elif skip:
+        query = query.offset(skip)
+
+    # One extra row tells whether there is a next page
+    return query.limit(max(limit, 0) + 1)
+
+
+def page(response: Response, rows: List, keyset: Optional[Keyset], limit: int) -> List:
+    """Trim the look-ahead row and publish the next cursor, if any (none for skip-paged sorts, keyset=None)"""
+    if limit <= 0:
+        return []
+    if len(rows) > limit:
+        rows = rows[:limit]
+        if keyset is not None:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(keyset, rows[-1])
+    return rows
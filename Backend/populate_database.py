@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
 
 from datetime import datetime
-from database import SessionLocal, engine, Base
+from database import SessionLocal, engine
+from migrations import apply_migrations
 from database import IntelligenceSignal, InventoryItem, Recommendation
 
 def populate_database():
-    Base.metadata.create_all(bind=engine)
+    apply_migrations(engine)
     db = SessionLocal()
     
     try:
@@ -7,20 +7,21 @@ from datetime import date, datetime, timedelta
 import random
 
 from database import (
-    SessionLocal, Base, engine,
+    SessionLocal, engine,
     InventoryItem, IntelligenceSignal, Recommendation,
     FoodWaste, Weather, Event, Sale, Order
 )
+from running_aggregates import rebuild_running_aggregates
+from migrations import reset_schema
 from models import (
     InventoryCategory, SignalCategory, Priority, RecommendationCategory,
     WasteReason, WeatherCondition, EventType, CustomerType, TimeOfDay, OrderStatus
 )
 
 def create_tables():
-    """Create all database tables"""
+    """Drop all database tables and migrate the empty database to the latest schema"""
     print("Creating database tables...")
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
+    reset_schema(engine)
     print("✅ Tables created successfully")
 
 def populate_inventory_items(db):
@@ -371,6 +372,7 @@ def main():
         populate_intelligence_signals(db)
 
         db.commit()
+        rebuild_running_aggregates(db)
         print("\n🎉 Database populated successfully!")
         print("\nData Summary:")
         print(f"   - {db.query(InventoryItem).count()} inventory items")
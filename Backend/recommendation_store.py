@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Recommendation Storage for Kopik
+Deduplicates recommendations by a stable fingerprint, upserting repeats with
+first-seen/last-seen timestamps, and compacts old rows or moves them to the archive
+"""
+
+import hashlib
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from database import SessionLocal, Recommendation
+from archive_store import archive_table, record_boundary
+
+RECOMMENDATION_RETENTION_DAYS = int(os.getenv('RECOMMENDATION_RETENTION_DAYS', '14'))
+RECOMMENDATION_COMPACTION_INTERVAL_SECONDS = float(os.getenv('RECOMMENDATION_COMPACTION_INTERVAL_SECONDS', '3600'))
+
+_NUMBER = r"\d[\d,]*(?:\.\d+)?"
+_UNITS = (
+    r"%|percent|x|°[cf]?|degrees?|gal(?:lon)?s?|lbs?|pounds?|kg|g|oz|ounces?|l|ml|lit(?:er|re)s?|"
+    r"units?|pieces?|pcs|bottles?|cases?|boxes?|bags?|cups?|servings?|dozen|items?|"
+    r"minutes?|hours?|days?|weeks?|months?"
+)
+# Amounts: currency, percentages and numbers with a unit. Other numbers (item ids,
+# names such as "item 2") are part of the recommendation's identity
+_QUANTITY = re.compile(rf"[$€£]\s?{_NUMBER}|(?<![\w.]){_NUMBER}\s?(?:{_UNITS})(?!\w)", re.IGNORECASE)
+
+
+def _value(field):
+    """Enum members (e.g. Priority) are stored by value"""
+    return getattr(field, 'value', field)
+
+
+def recommendation_fingerprint(category, description: str) -> str:
+    """
+    Stable identity for a recommendation
+
+    Amounts are masked so that "Increase inventory by 40% for X" and "... by 45% for X"
+    are the same recommendation seen twice, while "Reorder item 1" and "Reorder item 2"
+    stay two recommendations.
+    """
+    masked = _QUANTITY.sub(lambda match: re.sub(_NUMBER, "#", match.group(0)), (description or "").lower())
+    normalized = " ".join(masked.split())
+    material = f"{_value(category) or ''}|{normalized}"
+    return hashlib.sha1(material.encode("utf-8")).hexdigest()
+
+
+def upsert_recommendations(db, recommendations: List[Dict]) -> int:
+    """
+    Insert new recommendations and refresh ones already stored
+
+    Args:
+        db: Session; the caller commits
+        recommendations: Dicts with RecommendationCreate fields
+
+    Returns:
+        int: Number of distinct recommendations written
+    """
+    if not recommendations:
+        return 0
+
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    now = datetime.utcnow()
+    rows = {}
+    for rec in recommendations:
+        fingerprint = recommendation_fingerprint(rec.get("category"), rec.get("description"))
+        # One statement cannot touch the same row twice, so the last duplicate in a batch wins
+        rows[fingerprint] = {
+            "fingerprint": fingerprint,
+            "priority": _value(rec.get("priority")),
+            "title": rec.get("title"),
+            "description": rec.get("description"),
+            "confidence": rec.get("confidence"),
+            "profit_impact": rec.get("profit_impact"),
+            "action_required": rec.get("action_required", False),
+            "category": _value(rec.get("category")),
+            "trigger_sources": rec.get("trigger_sources"),
+            "first_seen_at": now,
+            "last_seen_at": now,
+            "seen_count": 1,
+            "created_at": now,
+            "updated_at": now
+        }
+
+    table = Recommendation.__table__
+    stmt = insert(table).values(list(rows.values()))
+    refreshed = ["priority", "title", "description", "confidence", "profit_impact",
+                 "action_required", "category", "trigger_sources", "last_seen_at", "updated_at"]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["fingerprint"],
+        set_={
+            **{column: stmt.excluded[column] for column in refreshed},
+            "seen_count": table.c.seen_count + 1
+        }
+    )
+    db.execute(stmt)
+    return len(rows)
+
+
+def compact_recommendations(db, retention_days: int = RECOMMENDATION_RETENTION_DAYS) -> Dict:
+    """
+    Fingerprint legacy rows, merge duplicates into the oldest row and expire stale recommendations
+
+    Args:
+        db: Session; the caller commits
+        retention_days: Recommendations not seen for this many days are deleted
+
+    Returns:
+        dict: Counts of fingerprinted, merged and expired rows
+    """
+    fingerprinted, merged = fingerprint_recommendations(db)
+
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    # Every row has last_seen_at once fingerprinted above, so this can use its index.
+    # Expired rows move to the cold archive instead of being dropped
+    expired = archive_table(db, "recommendations", cutoff)
+
+    return {
+        "fingerprinted": fingerprinted,
+        "merged": merged,
+        "expired": expired,
+        "retention_days": retention_days,
+        "cutoff": cutoff.isoformat()
+    }
+
+
+def fingerprint_recommendations(db) -> Tuple[int, int]:
+    """
+    Fingerprint rows that have none, merging duplicates into the oldest row; the caller commits
+
+    Returns:
+        tuple: (rows fingerprinted, rows merged away)
+    """
+    # Rows written before fingerprints existed (or by other tools) get one now
+    unfingerprinted = db.query(Recommendation).filter(Recommendation.fingerprint.is_(None)).order_by(Recommendation.id).all()
+    survivors = {
+        rec.fingerprint: rec
+        for rec in db.query(Recommendation).filter(Recommendation.fingerprint.isnot(None))
+    } if unfingerprinted else {}
+
+    merged = 0
+    for rec in unfingerprinted:
+        fingerprint = recommendation_fingerprint(rec.category, rec.description)
+        seen_at = rec.last_seen_at or rec.updated_at or rec.created_at
+        survivor = survivors.get(fingerprint)
+        if survivor is None:
+            rec.fingerprint = fingerprint
+            rec.first_seen_at = rec.first_seen_at or rec.created_at
+            rec.last_seen_at = seen_at
+            rec.seen_count = rec.seen_count or 1
+            survivors[fingerprint] = rec
+            db.flush()
+            continue
+
+        survivor.first_seen_at = min(filter(None, [survivor.first_seen_at, rec.first_seen_at, rec.created_at]))
+        survivor.last_seen_at = max(filter(None, [survivor.last_seen_at, seen_at]))
+        survivor.seen_count = (survivor.seen_count or 1) + (rec.seen_count or 1)
+        db.delete(rec)
+        merged += 1
+
+    return len(unfingerprinted) - merged, merged
+
+
+def run_compaction(retention_days: int = RECOMMENDATION_RETENTION_DAYS) -> Dict:
+    """Compaction job in its own session"""
+    db = SessionLocal()
+    try:
+        result = compact_recommendations(db, retention_days)
+        db.commit()
+        if result["expired"]:
+            record_boundary("recommendations", datetime.fromisoformat(result["cutoff"]))
+        print(f"🧹 Recommendations compacted: {result['merged']} merged, {result['expired']} expired")
+        return result
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else RECOMMENDATION_RETENTION_DAYS
+    print(run_compaction(days))
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import json
 import os
-import requests
+import time
 from datetime import datetime
 
 from database import (
@@ -15,8 +17,28 @@ from database import (
     Weather as DBWeather,
     Event as DBEvent,
     Sale as DBSale,
+    DailySalesRollup as DBDailySalesRollup,
     Order as DBOrder
 )
+from api_stack import db_route, run_db
+from analysis_engine import AnalysisEngine, get_analysis_engine
+from analysis_trigger import analysis_trigger
+from dashboard_snapshot import dashboard_snapshots, stream_dashboard_events
+from running_aggregates import record_sale, record_food_waste
+from recommendation_store import upsert_recommendations, recommendation_fingerprint
+from pagination import (
+    paginate, SIGNALS_PAGE, INVENTORY_PAGE, RECOMMENDATIONS_PAGE, FOOD_WASTE_PAGE,
+    WEATHER_PAGE, EVENTS_PAGE, SALES_PAGE, ORDERS_PAGE
+)
+from archive_store import include_archived
+from fast_json import wants_fast_json, fast_list_statement, fast_json_page
+from table_versions import versioned
+from fieldsets import parse_fields, load_fields, fieldset_page
+from inventory_filters import filter_inventory, parse_sort, sort_inventory
+from bulk_ingest import (
+    BULK_TARGETS, BulkBodyError, bulk_result, parse_bulk_body, unknown_item_ids, validate_rows, write_rows
+)
+from search_index import search
 from models import (
     IntelligenceSignal, IntelligenceSignalCreate,
     InventoryItem, InventoryItemCreate, InventoryItemUpdate,
@@ -24,30 +46,54 @@ from models import (
     FoodWaste, FoodWasteCreate,
     Weather, WeatherCreate,
     Event, EventCreate,
-    Sale, SaleCreate,
+    Sale, SaleCreate, SalesDailyRollup,
     Order, OrderCreate, OrderUpdate,
+    BulkIngestResult, SearchResults,
     Priority, RecommendationCategory
 )
 
 router = APIRouter()
 
-def call_intelligence_analyze():
-    """Call the existing intelligence/analyze endpoint and wait for completion"""
+# atomic=true batches with any bad row are rejected with the usual result body
+BULK_REJECTED = {422: {"model": BulkIngestResult, "description": "Batch rejected; nothing was inserted"}}
+
+async def _bulk_ingest(request: Request, target_name: str, atomic: bool) -> dict:
+    """Parse a JSON array / NDJSON body and insert it in one transaction"""
+    started = time.perf_counter()
     try:
-        print("🤖 Triggering intelligence analysis...")
-        response = requests.post('http://localhost:8000/api/intelligence/analyze', timeout=30)
-        if response.status_code == 200:
-            result = response.json()
-            print(f"✅ Intelligence analysis completed: {result.get('message', 'Success')}")
-            return True
-        else:
-            print(f"❌ Intelligence analysis failed with status: {response.status_code}")
-            return False
-    except Exception as e:
-        print(f"❌ Error calling intelligence/analyze: {e}")
-        return False
+        raw_rows = parse_bulk_body(await request.body(), request.headers.get("content-type", ""))
+    except BulkBodyError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    target = BULK_TARGETS[target_name]
+    # Validation is pure CPU work; keep it off the event loop
+    valid, errors = await run_in_threadpool(validate_rows, target, raw_rows)
+
+    def write(db):
+        inserted = write_rows(db, target, valid, errors, atomic)
+        db.commit()
+        return inserted
+
+    inserted = await run_db(write)
+    if inserted:
+        dashboard_snapshots.invalidate(f"bulk {target.label} ingested")
+    result = bulk_result(len(raw_rows), inserted, errors, started)
+    if atomic and errors:
+        # Nothing was written; same body as a success so clients read the per-row errors the same way
+        return JSONResponse(status_code=422, content=result)
+    return result
+
+def _require_inventory_item(db: Session, item_id: str):
+    """422 for a row referencing an unknown inventory item, as the bulk routes report it"""
+    if unknown_item_ids(db, [item_id]):
+        raise HTTPException(status_code=422, detail=[{
+            "loc": ["body", "item_id"],
+            "msg": f"unknown inventory item '{item_id}'",
+            "type": "value_error"
+        }])
 
 @router.post("/intelligence-signals/", response_model=IntelligenceSignal)
+@db_route
 def create_intelligence_signal(signal: IntelligenceSignalCreate, db: Session = Depends(get_db)):
     db_signal = DBIntelligenceSignal(**signal.dict())
     db.add(db_signal)
@@ -55,12 +101,15 @@ def create_intelligence_signal(signal: IntelligenceSignalCreate, db: Session = D
     db.refresh(db_signal)
     return db_signal
 
-@router.get("/intelligence-signals/", response_model=List[IntelligenceSignal])
-def read_intelligence_signals(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    signals = db.query(DBIntelligenceSignal).offset(skip).limit(limit).all()
-    return signals
+@router.get("/intelligence-signals/", response_model=List[IntelligenceSignal], dependencies=[versioned("intelligence_signals")])
+@db_route
+def read_intelligence_signals(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    fieldset = parse_fields(IntelligenceSignal, fields)
+    signals = paginate(load_fields(db.query(DBIntelligenceSignal), SIGNALS_PAGE, fieldset), SIGNALS_PAGE, cursor, skip, limit).all()
+    return fieldset_page(response, signals, SIGNALS_PAGE, limit, IntelligenceSignal, fieldset)
 
-@router.get("/intelligence-signals/{signal_id}", response_model=IntelligenceSignal)
+@router.get("/intelligence-signals/{signal_id}", response_model=IntelligenceSignal, dependencies=[versioned("intelligence_signals")])
+@db_route
 def read_intelligence_signal(signal_id: int, db: Session = Depends(get_db)):
     signal = db.query(DBIntelligenceSignal).filter(DBIntelligenceSignal.id == signal_id).first()
     if signal is None:
@@ -68,6 +117,7 @@ def read_intelligence_signal(signal_id: int, db: Session = Depends(get_db)):
     return signal
 
 @router.post("/inventory-items/", response_model=InventoryItem)
+@db_route
 def create_inventory_item(item: InventoryItemCreate, db: Session = Depends(get_db)):
     existing_item = db.query(DBInventoryItem).filter(DBInventoryItem.item_id == item.item_id).first()
     if existing_item:
@@ -81,18 +131,45 @@ def create_inventory_item(item: InventoryItemCreate, db: Session = Depends(get_d
     db.add(db_item)
     db.commit()
     db.refresh(db_item)
+    dashboard_snapshots.invalidate("inventory item created")
     
-    # Trigger intelligence analysis after adding item
-    call_intelligence_analyze()
+    # Schedule a debounced background analysis after adding item
+    analysis_trigger.request("inventory item created")
     
     return db_item
 
-@router.get("/inventory-items/", response_model=List[InventoryItem])
-def read_inventory_items(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    items = db.query(DBInventoryItem).offset(skip).limit(limit).all()
-    return items
-
-@router.get("/inventory-items/{item_id}", response_model=InventoryItem)
+@router.get("/inventory-items/", response_model=List[InventoryItem], dependencies=[versioned("inventory_items")])
+@db_route
+def read_inventory_items(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    category: Optional[str] = None,
+    supplier: Optional[str] = None,
+    below_reorder: bool = False,
+    min_stock_ratio: Optional[float] = None,
+    max_stock_ratio: Optional[float] = None,
+    q: Optional[str] = None,
+    sort: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    fieldset = parse_fields(InventoryItem, fields)
+    order = parse_sort(sort)
+    query = filter_inventory(
+        db.query(DBInventoryItem), category, supplier, below_reorder, min_stock_ratio, max_stock_ratio, q
+    )
+    query = load_fields(query, INVENTORY_PAGE, fieldset)
+
+    if order:
+        items = sort_inventory(query, order, cursor, skip, limit).all()
+        return fieldset_page(response, items, None, limit, InventoryItem, fieldset)
+    items = paginate(query, INVENTORY_PAGE, cursor, skip, limit).all()
+    return fieldset_page(response, items, INVENTORY_PAGE, limit, InventoryItem, fieldset)
+
+@router.get("/inventory-items/{item_id}", response_model=InventoryItem, dependencies=[versioned("inventory_items")])
+@db_route
 def read_inventory_item(item_id: str, db: Session = Depends(get_db)):
     item = db.query(DBInventoryItem).filter(DBInventoryItem.item_id == item_id).first()
     if item is None:
@@ -100,6 +177,7 @@ def read_inventory_item(item_id: str, db: Session = Depends(get_db)):
     return item
 
 @router.put("/inventory-items/{item_id}", response_model=InventoryItem)
+@db_route
 def update_inventory_item(item_id: str, item_update: InventoryItemUpdate, db: Session = Depends(get_db)):
     db_item = db.query(DBInventoryItem).filter(DBInventoryItem.item_id == item_id).first()
     if db_item is None:
@@ -114,13 +192,15 @@ def update_inventory_item(item_id: str, item_update: InventoryItemUpdate, db: Se
     
     db.commit()
     db.refresh(db_item)
+    dashboard_snapshots.invalidate("inventory item updated")
     
-    # Trigger intelligence analysis after updating item
-    call_intelligence_analyze()
+    # Schedule a debounced background analysis after updating item
+    analysis_trigger.request("inventory item updated")
     
     return db_item
 
 @router.delete("/inventory-items/{item_id}")
+@db_route
 def delete_inventory_item(item_id: str, db: Session = Depends(get_db)):
     db_item = db.query(DBInventoryItem).filter(DBInventoryItem.item_id == item_id).first()
     if db_item is None:
@@ -128,13 +208,15 @@ def delete_inventory_item(item_id: str, db: Session = Depends(get_db)):
     
     db.delete(db_item)
     db.commit()
+    dashboard_snapshots.invalidate("inventory item deleted")
     
-    # Trigger intelligence analysis after deleting item
-    call_intelligence_analyze()
+    # Schedule a debounced background analysis after deleting item
+    analysis_trigger.request("inventory item deleted")
     
     return {"message": "Inventory item deleted successfully"}
 
-@router.get("/inventory-items/low-stock/", response_model=List[InventoryItem])
+@router.get("/inventory-items/low-stock/", response_model=List[InventoryItem], dependencies=[versioned("inventory_items")])
+@db_route
 def get_low_stock_items(db: Session = Depends(get_db)):
     items = db.query(DBInventoryItem).filter(
         DBInventoryItem.current_stock <= DBInventoryItem.reorder_point
@@ -142,21 +224,27 @@ def get_low_stock_items(db: Session = Depends(get_db)):
     return items
 
 @router.post("/recommendations/", response_model=Recommendation)
+@db_route
 def create_recommendation(recommendation: RecommendationCreate, db: Session = Depends(get_db)):
-    db_recommendation = DBRecommendation(**recommendation.dict())
-    db.add(db_recommendation)
+    # Posting a recommendation that already exists refreshes it instead of duplicating it
+    upsert_recommendations(db, [recommendation.dict()])
     db.commit()
-    db.refresh(db_recommendation)
-    return db_recommendation
+    fingerprint = recommendation_fingerprint(recommendation.category, recommendation.description)
+    return db.query(DBRecommendation).filter(DBRecommendation.fingerprint == fingerprint).first()
 
-@router.get("/recommendations/", response_model=List[Recommendation])
+@router.get("/recommendations/", response_model=List[Recommendation], dependencies=[versioned("recommendations")])
+@db_route
 def read_recommendations(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     priority: str = None,
     category: str = None,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
+    fieldset = parse_fields(Recommendation, fields)
     query = db.query(DBRecommendation)
     
     if priority:
@@ -164,17 +252,19 @@ def read_recommendations(
     if category:
         query = query.filter(DBRecommendation.category == category)
     
-    recommendations = query.offset(skip).limit(limit).all()
-    return recommendations
+    recommendations = paginate(load_fields(query, RECOMMENDATIONS_PAGE, fieldset), RECOMMENDATIONS_PAGE, cursor, skip, limit).all()
+    return fieldset_page(response, recommendations, RECOMMENDATIONS_PAGE, limit, Recommendation, fieldset)
 
-@router.get("/recommendations/{recommendation_id}", response_model=Recommendation)
+@router.get("/recommendations/{recommendation_id}", response_model=Recommendation, dependencies=[versioned("recommendations")])
+@db_route
 def read_recommendation(recommendation_id: int, db: Session = Depends(get_db)):
     recommendation = db.query(DBRecommendation).filter(DBRecommendation.id == recommendation_id).first()
     if recommendation is None:
         raise HTTPException(status_code=404, detail="Recommendation not found")
     return recommendation
 
-@router.get("/recommendations/high-priority/", response_model=List[Recommendation])
+@router.get("/recommendations/high-priority/", response_model=List[Recommendation], dependencies=[versioned("recommendations")])
+@db_route
 def get_high_priority_recommendations(db: Session = Depends(get_db)):
     recommendations = db.query(DBRecommendation).filter(
         DBRecommendation.priority == "high"
@@ -183,42 +273,70 @@ def get_high_priority_recommendations(db: Session = Depends(get_db)):
 
 # Food Waste Routes
 @router.post("/food-waste/", response_model=FoodWaste)
+@db_route
 def create_food_waste(waste: FoodWasteCreate, db: Session = Depends(get_db)):
+    _require_inventory_item(db, waste.item_id)
     db_waste = DBFoodWaste(**waste.dict())
     db.add(db_waste)
+    record_food_waste(db, db_waste)
     db.commit()
     db.refresh(db_waste)
+    dashboard_snapshots.invalidate("food waste recorded")
     return db_waste
 
-@router.get("/food-waste/", response_model=List[FoodWaste])
-def read_food_waste(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    waste_records = db.query(DBFoodWaste).offset(skip).limit(limit).all()
-    return waste_records
+@router.post("/food-waste/bulk", response_model=BulkIngestResult, responses=BULK_REJECTED)
+async def bulk_create_food_waste(request: Request, atomic: bool = False):
+    """Insert many waste records from a JSON array or NDJSON body; atomic=true rejects the batch with a 422 on any error"""
+    return await _bulk_ingest(request, "food_waste", atomic)
+
+@router.get("/food-waste/", response_model=List[FoodWaste], dependencies=[versioned("food_waste")])
+@db_route
+def read_food_waste(request: Request, response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    fieldset = parse_fields(FoodWaste, fields)
+    if wants_fast_json(request, "food_waste"):
+        rows = db.execute(fast_list_statement("food_waste", cursor, skip, limit, fieldset)).all()
+        return fast_json_page(response, "food_waste", rows, limit, fieldset)
+    waste_records = paginate(load_fields(db.query(DBFoodWaste), FOOD_WASTE_PAGE, fieldset), FOOD_WASTE_PAGE, cursor, skip, limit).all()
+    return fieldset_page(response, waste_records, FOOD_WASTE_PAGE, limit, FoodWaste, fieldset)
 
 @router.get("/food-waste/recent/", response_model=List[FoodWaste])
-def get_recent_food_waste(days: int = 7, db: Session = Depends(get_db)):
+async def get_recent_food_waste(days: int = 7):
     from datetime import date, timedelta
     cutoff_date = date.today() - timedelta(days=days)
-    waste_records = db.query(DBFoodWaste).filter(
+    waste_records = await run_db(lambda db: db.query(DBFoodWaste).filter(
         DBFoodWaste.waste_date >= cutoff_date
-    ).all()
-    return waste_records
+    ).all())
+    # Windows reaching past the archive horizon also read the archived partitions (file I/O, so off the loop)
+    return await run_in_threadpool(include_archived, waste_records, "food_waste", cutoff_date)
 
 # Weather Routes
 @router.post("/weather/", response_model=Weather)
+@db_route
 def create_weather(weather: WeatherCreate, db: Session = Depends(get_db)):
     db_weather = DBWeather(**weather.dict())
     db.add(db_weather)
     db.commit()
     db.refresh(db_weather)
+    dashboard_snapshots.invalidate("weather recorded")
     return db_weather
 
-@router.get("/weather/", response_model=List[Weather])
-def read_weather(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    weather_records = db.query(DBWeather).order_by(DBWeather.date.desc()).offset(skip).limit(limit).all()
-    return weather_records
+@router.post("/weather/bulk", response_model=BulkIngestResult, responses=BULK_REJECTED)
+async def bulk_create_weather(request: Request, atomic: bool = False):
+    """Insert many weather records from a JSON array or NDJSON body; atomic=true rejects the batch with a 422 on any error"""
+    return await _bulk_ingest(request, "weather", atomic)
+
+@router.get("/weather/", response_model=List[Weather], dependencies=[versioned("weather")])
+@db_route
+def read_weather(request: Request, response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    fieldset = parse_fields(Weather, fields)
+    if wants_fast_json(request, "weather"):
+        rows = db.execute(fast_list_statement("weather", cursor, skip, limit, fieldset)).all()
+        return fast_json_page(response, "weather", rows, limit, fieldset)
+    weather_records = paginate(load_fields(db.query(DBWeather), WEATHER_PAGE, fieldset), WEATHER_PAGE, cursor, skip, limit).all()
+    return fieldset_page(response, weather_records, WEATHER_PAGE, limit, Weather, fieldset)
 
 @router.get("/weather/current/", response_model=Weather)
+@db_route
 def get_current_weather(db: Session = Depends(get_db)):
     weather = db.query(DBWeather).order_by(DBWeather.date.desc()).first()
     if weather is None:
@@ -227,19 +345,24 @@ def get_current_weather(db: Session = Depends(get_db)):
 
 # Event Routes
 @router.post("/events/", response_model=Event)
+@db_route
 def create_event(event: EventCreate, db: Session = Depends(get_db)):
     db_event = DBEvent(**event.dict())
     db.add(db_event)
     db.commit()
     db.refresh(db_event)
+    dashboard_snapshots.invalidate("event created")
     return db_event
 
-@router.get("/events/", response_model=List[Event])
-def read_events(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    events = db.query(DBEvent).offset(skip).limit(limit).all()
-    return events
+@router.get("/events/", response_model=List[Event], dependencies=[versioned("events")])
+@db_route
+def read_events(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    fieldset = parse_fields(Event, fields)
+    events = paginate(load_fields(db.query(DBEvent), EVENTS_PAGE, fieldset), EVENTS_PAGE, cursor, skip, limit).all()
+    return fieldset_page(response, events, EVENTS_PAGE, limit, Event, fieldset)
 
 @router.get("/events/upcoming/", response_model=List[Event])
+@db_route
 def get_upcoming_events(days: int = 14, db: Session = Depends(get_db)):
     from datetime import date, timedelta
     today = date.today()
@@ -252,52 +375,91 @@ def get_upcoming_events(days: int = 14, db: Session = Depends(get_db)):
 
 # Sales Routes
 @router.post("/sales/", response_model=Sale)
+@db_route
 def create_sale(sale: SaleCreate, db: Session = Depends(get_db)):
+    _require_inventory_item(db, sale.item_id)
     db_sale = DBSale(**sale.dict())
     db.add(db_sale)
+    record_sale(db, db_sale)
     db.commit()
     db.refresh(db_sale)
+    dashboard_snapshots.invalidate("sale recorded")
     return db_sale
 
-@router.get("/sales/", response_model=List[Sale])
-def read_sales(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    sales = db.query(DBSale).order_by(DBSale.sale_date.desc()).offset(skip).limit(limit).all()
-    return sales
+@router.post("/sales/bulk", response_model=BulkIngestResult, responses=BULK_REJECTED)
+async def bulk_create_sales(request: Request, atomic: bool = False):
+    """Insert many sales from a JSON array or NDJSON body; atomic=true rejects the batch with a 422 on any error"""
+    return await _bulk_ingest(request, "sales", atomic)
+
+@router.get("/sales/", response_model=List[Sale], dependencies=[versioned("sales")])
+@db_route
+def read_sales(request: Request, response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    fieldset = parse_fields(Sale, fields)
+    if wants_fast_json(request, "sales"):
+        rows = db.execute(fast_list_statement("sales", cursor, skip, limit, fieldset)).all()
+        return fast_json_page(response, "sales", rows, limit, fieldset)
+    sales = paginate(load_fields(db.query(DBSale), SALES_PAGE, fieldset), SALES_PAGE, cursor, skip, limit).all()
+    return fieldset_page(response, sales, SALES_PAGE, limit, Sale, fieldset)
 
 @router.get("/sales/recent/", response_model=List[Sale])
-def get_recent_sales(days: int = 7, db: Session = Depends(get_db)):
+async def get_recent_sales(days: int = 7):
     from datetime import date, timedelta
     cutoff_date = date.today() - timedelta(days=days)
-    sales = db.query(DBSale).filter(
+    sales = await run_db(lambda db: db.query(DBSale).filter(
         DBSale.sale_date >= cutoff_date
-    ).order_by(DBSale.sale_date.desc()).all()
-    return sales
+    ).order_by(DBSale.sale_date.desc()).all())
+    return await run_in_threadpool(include_archived, sales, "sales", cutoff_date)
+
+@router.get("/sales/daily/", response_model=List[SalesDailyRollup])
+@db_route
+def get_daily_sales(days: int = 30, item_id: str = None, db: Session = Depends(get_db)):
+    """Daily sales per item, time of day and customer type, read from the rollup instead of raw sales"""
+    from datetime import date, timedelta
+    cutoff_date = date.today() - timedelta(days=days)
+    query = db.query(DBDailySalesRollup).filter(DBDailySalesRollup.sale_date >= cutoff_date)
+    if item_id:
+        query = query.filter(DBDailySalesRollup.item_id == item_id)
+    return query.order_by(DBDailySalesRollup.sale_date.desc()).all()
 
 @router.get("/sales/by-item/{item_id}", response_model=List[Sale])
-def get_sales_by_item(item_id: str, days: int = 30, db: Session = Depends(get_db)):
+async def get_sales_by_item(item_id: str, days: int = 30):
     from datetime import date, timedelta
     cutoff_date = date.today() - timedelta(days=days)
-    sales = db.query(DBSale).filter(
+    sales = await run_db(lambda db: db.query(DBSale).filter(
         DBSale.item_id == item_id,
         DBSale.sale_date >= cutoff_date
-    ).order_by(DBSale.sale_date.desc()).all()
-    return sales
+    ).order_by(DBSale.sale_date.desc()).all())
+    return await run_in_threadpool(include_archived, sales, "sales", cutoff_date, item_id=item_id)
 
 # Order Routes
 @router.post("/orders/", response_model=Order)
+@db_route
 def create_order(order: OrderCreate, db: Session = Depends(get_db)):
+    _require_inventory_item(db, order.item_id)
     db_order = DBOrder(**order.dict())
     db.add(db_order)
     db.commit()
     db.refresh(db_order)
+    dashboard_snapshots.invalidate("order created")
     return db_order
 
-@router.get("/orders/", response_model=List[Order])
-def read_orders(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    orders = db.query(DBOrder).order_by(DBOrder.order_date.desc()).offset(skip).limit(limit).all()
-    return orders
-
-@router.get("/orders/pending/", response_model=List[Order])
+@router.post("/orders/bulk", response_model=BulkIngestResult, responses=BULK_REJECTED)
+async def bulk_create_orders(request: Request, atomic: bool = False):
+    """Insert many orders from a JSON array or NDJSON body; atomic=true rejects the batch with a 422 on any error"""
+    return await _bulk_ingest(request, "orders", atomic)
+
+@router.get("/orders/", response_model=List[Order], dependencies=[versioned("orders")])
+@db_route
+def read_orders(request: Request, response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    fieldset = parse_fields(Order, fields)
+    if wants_fast_json(request, "orders"):
+        rows = db.execute(fast_list_statement("orders", cursor, skip, limit, fieldset)).all()
+        return fast_json_page(response, "orders", rows, limit, fieldset)
+    orders = paginate(load_fields(db.query(DBOrder), ORDERS_PAGE, fieldset), ORDERS_PAGE, cursor, skip, limit).all()
+    return fieldset_page(response, orders, ORDERS_PAGE, limit, Order, fieldset)
+
+@router.get("/orders/pending/", response_model=List[Order], dependencies=[versioned("orders")])
+@db_route
 def get_pending_orders(db: Session = Depends(get_db)):
     orders = db.query(DBOrder).filter(
         DBOrder.status.in_(["pending", "delayed"])
@@ -305,6 +467,7 @@ def get_pending_orders(db: Session = Depends(get_db)):
     return orders
 
 @router.put("/orders/{order_id}", response_model=Order)
+@db_route
 def update_order(order_id: int, order_update: OrderUpdate, db: Session = Depends(get_db)):
     db_order = db.query(DBOrder).filter(DBOrder.id == order_id).first()
     if db_order is None:
@@ -316,148 +479,92 @@ def update_order(order_id: int, order_update: OrderUpdate, db: Session = Depends
 
     db.commit()
     db.refresh(db_order)
+    dashboard_snapshots.invalidate("order updated")
     return db_order
 
-@router.get("/orders/{order_id}", response_model=Order)
+@router.get("/orders/{order_id}", response_model=Order, dependencies=[versioned("orders")])
+@db_route
 def read_order(order_id: int, db: Session = Depends(get_db)):
     order = db.query(DBOrder).filter(DBOrder.id == order_id).first()
     if order is None:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
 
+# Search Routes
+@router.get(
+    "/search",
+    response_model=SearchResults,
+    dependencies=[versioned("inventory_items", "recommendations", "intelligence_signals")]
+)
+@db_route
+def search_all(q: str, types: Optional[str] = None, limit: int = 20, db: Session = Depends(get_db)):
+    """Ranked full-text search over inventory names, recommendations and intelligence signals"""
+    return search(db, q, types, limit)
+
 # AI Agent Intelligence Endpoints
 @router.get("/intelligence/dashboard")
-def get_intelligence_dashboard():
-    """Get comprehensive business intelligence insights for dashboard"""
-    try:
-        import sys
-        import os
-        from datetime import datetime
-
-        # Add agents directory to path
-        agents_path = os.path.join(os.path.dirname(__file__), 'agents')
-        if agents_path not in sys.path:
-            sys.path.append(agents_path)
-
-        from agents.enhanced_agent import EnhancedKopikAgent
-        from models import Priority
-
-        # Create agent and get data
-        agent = EnhancedKopikAgent()
-        data = agent.fetch_comprehensive_data()
-
-        # Run analyses
-        inventory_alerts, inventory_solutions = agent.analyze_inventory(data['inventory'])
-        waste_alerts, waste_solutions = agent.analyze_food_waste(data['food_waste'])
-        weather_alerts, weather_solutions = agent.analyze_weather_impact(data['weather'], data['sales'])
-        event_alerts, event_solutions = agent.analyze_events(data['events'])
-        order_alerts, order_solutions = agent.analyze_orders(data['orders'])
-        
-        # Combine results
-        all_alerts = inventory_alerts + waste_alerts + weather_alerts + event_alerts + order_alerts
-        all_solutions = inventory_solutions + waste_solutions + weather_solutions + event_solutions + order_solutions
-
-        # Calculate metrics
-        high_priority_count = len([a for a in all_alerts if a.get('priority') == Priority.HIGH.value])
-        total_profit_impact = sum(s.get('profit_impact', 0) for s in all_solutions)
-
-        # Generate data overview for summary
-        data_overview = {
-            "low_stock_items": len(data['inventory']),
-            "recent_waste_records": len(data['food_waste']),
-            "upcoming_events": len(data['events']),
-            "pending_orders": len(data['orders'])
-        }
-
-        # Generate LLM summary
-        summary = agent.generate_summary(all_alerts, all_solutions, data_overview)
-
-        # Enhanced LLM Features
-        try:
-            from llm_explanations import explanation_service
-            from llm_risk_analyzer import risk_analyzer
-            from llm_menu_optimizer import menu_optimizer
-
-            # Risk analysis
-            risk_analysis = risk_analyzer.analyze_business_patterns(data)
+async def get_intelligence_dashboard(refresh: bool = False):
+    """Get comprehensive business intelligence insights for dashboard
 
-            # Menu suggestions
-            menu_suggestions = menu_optimizer.generate_menu_suggestions(data)
-
-            llm_features = {
-                "risk_analysis": risk_analysis,
-                "menu_optimization": menu_suggestions
-            }
-
-        except Exception as e:
-            llm_features = {"error": f"Advanced LLM features unavailable: {str(e)[:50]}"}
-            explanation_service = None
-
-        # Format response
+    Served from the materialized snapshot; pass refresh=true to force a synchronous rebuild.
+    """
+    try:
+        snapshot = dashboard_snapshots.fresh_snapshot() if not refresh else None
+        if snapshot is None:
+            # Loading or rebuilding runs the agent and LLM calls, which block
+            snapshot = await run_in_threadpool(dashboard_snapshots.get_snapshot, refresh)
         return {
-            "success": True,
-            "timestamp": datetime.now().isoformat(),
-            "summary": summary,  # LLM-generated business summary
-            "metrics": {
-                "total_alerts": len(all_alerts),
-                "high_priority_alerts": high_priority_count,
-                "total_recommendations": len(all_solutions),
-                "total_profit_impact": round(total_profit_impact, 2)
-            },
-            "llm_features": llm_features,  # Advanced LLM capabilities
-            "alerts": [
-                {
-                    "id": i + 1,
-                    "type": alert.get("type", "general"),
-                    "title": alert.get("type", "general").replace("_", " ").title(),
-                    "message": alert.get("message", ""),
-                    "priority": str(alert.get("priority", "medium")).replace("Priority.", "").lower(),
-                    "category": str(alert.get("category", "inventory")).replace("RecommendationCategory.", "").lower(),
-                    "timestamp": datetime.now().isoformat(),
-                    "actionable": True
-                }
-                for i, alert in enumerate(all_alerts[:10])  # Limit to top 10
-            ],
-            "recommendations": [
-                {
-                    "id": i + 1,
-                    "title": solution.get("description", "")[:50] + "..." if len(solution.get("description", "")) > 50 else solution.get("description", ""),
-                    "description": solution.get("description", ""),
-                    "confidence": round(solution.get("confidence", 80), 1),
-                    "profit_impact": round(solution.get("profit_impact", 0), 2),
-                    "explanation": explanation_service.explain_recommendation(solution, data_overview) if 'explanation_service' in locals() and explanation_service else f"Recommended: {solution.get('description', 'Take action')}"
-                }
-                for i, solution in enumerate(all_solutions[:10])  # Limit to top 10
-            ],
-            "data_overview": data_overview
+            **snapshot["payload"],
+            "snapshot": dashboard_snapshots.describe(snapshot)
         }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Intelligence analysis failed: {str(e)}")
 
+@router.get("/intelligence/dashboard/stream")
+def stream_intelligence_dashboard(engine: AnalysisEngine = Depends(get_analysis_engine)):
+    """Stream the dashboard as Server-Sent Events, one event per section as it finishes"""
+    return StreamingResponse(
+        stream_dashboard_events(engine, dashboard_snapshots),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/intelligence/analyze")
-def trigger_intelligence_analysis():
+def trigger_intelligence_analysis(engine: AnalysisEngine = Depends(get_analysis_engine)):
     """Trigger a fresh intelligence analysis and return summary"""
     try:
-        import sys
-        
-        # Add agents directory to path
-        agents_path = os.path.join(os.path.dirname(__file__), 'agents')
-        if agents_path not in sys.path:
-            sys.path.append(agents_path)
-
-        from agents.enhanced_agent import EnhancedKopikAgent
-
-        # Run analysis
-        agent = EnhancedKopikAgent()
-        success = agent.run_comprehensive_analysis()
-        
+        success = engine.run_analysis()
+
         return {
             "success": success,
             "message": "Analysis completed successfully" if success else "Analysis failed",
             "timestamp": datetime.now().isoformat(),
-            "analysis_count": agent.analysis_count
+            "analysis_count": engine.agent.analysis_count
         }
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Analysis trigger failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Analysis trigger failed: {str(e)}")
+
+@router.get("/intelligence/engine")
+def get_analysis_engine_status(engine: AnalysisEngine = Depends(get_analysis_engine)):
+    """Uptime, build counts and last-run timings for the application-scoped analysis engine"""
+    return engine.status()
+
+@router.get("/intelligence/analyze/status")
+def get_intelligence_analysis_status():
+    """Queue depth and last-run metrics for the background analysis trigger"""
+    return analysis_trigger.metrics()
+
+@router.get("/intelligence/llm-cache")
+def get_llm_cache_stats():
+    """Hit/miss counters and entry counts for the shared LLM response cache"""
+    from llm_cache import llm_cache
+    return llm_cache.stats()
+
+@router.delete("/intelligence/llm-cache")
+def clear_llm_cache(namespace: str = None):
+    """Drop cached LLM responses, optionally for a single service namespace"""
+    from llm_cache import llm_cache
+    llm_cache.clear(namespace)
+    return {"message": f"LLM cache cleared{f' for {namespace}' if namespace else ''}"}
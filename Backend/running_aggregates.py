@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Incremental Running Aggregates for Kopik
+Keeps the daily sales rollup (per day, item, time of day and customer type) and
+per-item, per-day, per-reason waste totals up to date in the same transaction
+as each insert, so the analyzers read precomputed totals instead of scanning
+raw history
+
+The sales rollup keeps the full history; its size grows with days x items, not
+with transactions. Rebuild it from the raw sales with:
+    python running_aggregates.py [--since YYYY-MM-DD]
+"""
+
+import argparse
+import os
+from datetime import date, timedelta
+
+from sqlalchemy import func, insert, select
+
+from database import (
+    SessionLocal, Sale, FoodWaste, DailySalesRollup, WasteDailyTotal
+)
+from archive_store import archive_boundary
+
+# Longest analysis window is 30 days of waste; keep a few days of slack
+RUNNING_AGGREGATE_DAYS = int(os.getenv('RUNNING_AGGREGATE_DAYS', '35'))
+
+UNKNOWN = "unknown"  # rollup key for sales without a time of day / customer type
+
+_last_expired_on = None
+
+
+def _value(field):
+    """Enum members (e.g. WasteReason) are stored by value"""
+    return getattr(field, 'value', field)
+
+
+def _upsert_increments(db, model, key_columns: list, rows: list):
+    """INSERT ... ON CONFLICT DO UPDATE for many rows, adding each row's increments to an existing totals row"""
+    if not rows:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    table = model.__table__
+    increments = [column for column in rows[0] if column not in key_columns]
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={column: table.c[column] + stmt.excluded[column] for column in increments}
+    )
+    # Rows are passed as parameters so the compiled statement is cached and reused
+    db.execute(stmt, rows)
+
+
+def _upsert_increment(db, model, keys: dict, increments: dict):
+    """INSERT ... ON CONFLICT DO UPDATE adding increments to an existing totals row"""
+    _upsert_increments(db, model, list(keys), [{**keys, **increments}])
+
+
+def _rollup_key(sale_date, item_id, time_of_day, customer_type) -> tuple:
+    return (sale_date, item_id, _value(time_of_day) or UNKNOWN, _value(customer_type) or UNKNOWN)
+
+
+def record_sale(db, sale):
+    """Add one sale to the daily rollup; call before db.commit() so both land together"""
+    sale_date, item_id, time_of_day, customer_type = _rollup_key(
+        sale.sale_date, sale.item_id, sale.time_of_day, sale.customer_type
+    )
+    _upsert_increment(db, DailySalesRollup, {
+        "sale_date": sale_date,
+        "item_id": item_id,
+        "time_of_day": time_of_day,
+        "customer_type": customer_type
+    }, {
+        "transactions": 1,
+        "quantity": sale.quantity_sold,
+        "revenue": sale.total_amount
+    })
+    expire_old_totals(db)
+
+
+def record_food_waste(db, waste):
+    """Add one waste record to the running totals; call before db.commit() so both land together"""
+    _upsert_increment(db, WasteDailyTotal, {
+        "waste_date": waste.waste_date,
+        "item_id": waste.item_id,
+        "reason": _value(waste.reason)
+    }, {
+        "records": 1,
+        "quantity": waste.quantity_wasted,
+        "cost": waste.cost_impact
+    })
+    expire_old_totals(db)
+
+
+def record_sales(db, sales: list):
+    """Add a batch of sale rows (dicts) to the daily rollup, one upsert per rollup key"""
+    totals = {}
+    for sale in sales:
+        key = _rollup_key(sale["sale_date"], sale["item_id"], sale.get("time_of_day"), sale.get("customer_type"))
+        total = totals.setdefault(key, {
+            "sale_date": key[0], "item_id": key[1], "time_of_day": key[2], "customer_type": key[3],
+            "transactions": 0, "quantity": 0.0, "revenue": 0.0
+        })
+        total["transactions"] += 1
+        total["quantity"] += sale["quantity_sold"]
+        total["revenue"] += sale["total_amount"]
+    _upsert_increments(db, DailySalesRollup, ["sale_date", "item_id", "time_of_day", "customer_type"], list(totals.values()))
+    expire_old_totals(db)
+
+
+def record_food_waste_batch(db, waste_records: list):
+    """Add a batch of waste rows (dicts) to the running totals, one upsert per (day, item, reason)"""
+    cutoff = date.today() - timedelta(days=RUNNING_AGGREGATE_DAYS)
+    totals = {}
+    for waste in waste_records:
+        if waste["waste_date"] < cutoff:
+            continue  # backfilled history outside the analysis window
+        key = (waste["waste_date"], waste["item_id"], _value(waste["reason"]))
+        total = totals.setdefault(key, {"waste_date": key[0], "item_id": key[1], "reason": key[2], "records": 0, "quantity": 0.0, "cost": 0.0})
+        total["records"] += 1
+        total["quantity"] += waste["quantity_wasted"]
+        total["cost"] += waste["cost_impact"]
+    _upsert_increments(db, WasteDailyTotal, ["waste_date", "item_id", "reason"], list(totals.values()))
+    expire_old_totals(db)
+
+
+def expire_old_totals(db, force: bool = False):
+    """Drop waste totals for days that have left the analysis window (at most once per day per process)"""
+    global _last_expired_on
+    today = date.today()
+    if _last_expired_on == today and not force:
+        return
+
+    cutoff = today - timedelta(days=RUNNING_AGGREGATE_DAYS)
+    db.query(WasteDailyTotal).filter(WasteDailyTotal.waste_date < cutoff).delete(synchronize_session=False)
+    _last_expired_on = today
+
+
+def backfill_sales_rollup(db, since: date = None) -> int:
+    """
+    Recompute the daily sales rollup from the raw sales table; the caller commits
+
+    Args:
+        db: Session
+        since: Only rebuild days on or after this date (default: the whole history)
+
+    Returns:
+        int: Rollup rows written
+    """
+    # Sales before the archive boundary are no longer in the table; their rollup rows are kept
+    boundary = archive_boundary("sales")
+    if boundary and (since is None or since < boundary):
+        print(f"🧊 Sales before {boundary} are archived; keeping their rollup rows")
+        since = boundary
+
+    delete = db.query(DailySalesRollup)
+    if since:
+        delete = delete.filter(DailySalesRollup.sale_date >= since)
+    delete.delete(synchronize_session=False)
+
+    # Same keys as _rollup_key on the write path, where an empty string is also unknown
+    time_of_day = func.coalesce(func.nullif(Sale.time_of_day, ""), UNKNOWN)
+    customer_type = func.coalesce(func.nullif(Sale.customer_type, ""), UNKNOWN)
+    grouped = select(
+        Sale.sale_date,
+        Sale.item_id,
+        time_of_day,
+        customer_type,
+        func.count(Sale.id),
+        func.coalesce(func.sum(Sale.quantity_sold), 0.0),
+        func.coalesce(func.sum(Sale.total_amount), 0.0)
+    ).group_by(Sale.sale_date, Sale.item_id, time_of_day, customer_type)
+    if since:
+        grouped = grouped.where(Sale.sale_date >= since)
+
+    # INSERT ... SELECT keeps the aggregation inside the database
+    result = db.execute(insert(DailySalesRollup).from_select([
+        "sale_date", "item_id", "time_of_day", "customer_type", "transactions", "quantity", "revenue"
+    ], grouped))
+    return result.rowcount
+
+
+def rebuild_running_aggregates(db=None, since: date = None):
+    """Recompute the sales rollup (from since, or all history) and the waste totals for the retention window"""
+    owns_session = db is None
+    db = db or SessionLocal()
+    try:
+        cutoff = date.today() - timedelta(days=RUNNING_AGGREGATE_DAYS)
+
+        db.query(WasteDailyTotal).delete(synchronize_session=False)
+        sales_rows = backfill_sales_rollup(db, since)
+
+        waste_rows = db.query(
+            FoodWaste.waste_date,
+            FoodWaste.item_id,
+            FoodWaste.reason,
+            func.count(FoodWaste.id),
+            func.sum(FoodWaste.quantity_wasted),
+            func.sum(FoodWaste.cost_impact)
+        ).filter(FoodWaste.waste_date >= cutoff).group_by(
+            FoodWaste.waste_date, FoodWaste.item_id, FoodWaste.reason
+        ).all()
+        db.bulk_insert_mappings(WasteDailyTotal, [
+            {"waste_date": d, "item_id": item_id, "reason": reason, "records": n, "quantity": qty or 0.0, "cost": cost or 0.0}
+            for d, item_id, reason, n, qty, cost in waste_rows
+        ])
+
+        db.commit()
+        print(f"📊 Rebuilt running aggregates: {sales_rows} sales rollup rows, {len(waste_rows)} waste days")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        if owns_session:
+            db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the daily sales rollup and waste totals from raw data")
+    parser.add_argument("--since", type=date.fromisoformat, default=None,
+                        help="only rebuild sales rollup days on or after this date (YYYY-MM-DD)")
+    args = parser.parse_args()
+    rebuild_running_aggregates(since=args.since)
@@ -0,0 +1,202 @@
+"""
+Full-Text Search for Kopik
+SQLite FTS5 indexes over inventory item names, recommendation titles and
+descriptions, and intelligence signal names and impact descriptions. Each is an
+external-content FTS5 table (<table>_fts) that stores only the index; triggers
+on the source table keep it in sync with every insert, update and delete
+
+search() ranks hits with bm25 within each table (title columns weigh more than
+descriptions) and interleaves the tables round-robin, since bm25 scores from
+different FTS tables are not on a common scale; it returns HTML-escaped text
+with <mark> around the matched terms. Databases
+without FTS5 (Postgres, or SQLite built without it) fall back to a LIKE scan
+with the same response shape and no ranking
+"""
+
+import html
+import re
+import time
+from itertools import zip_longest
+from typing import Dict, List, NamedTuple, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, select, text
+from sqlalchemy.exc import OperationalError
+
+from database import Base
+
+
+class SearchIndex(NamedTuple):
+    """A table covered by full-text search"""
+    table: str
+    title_column: str
+    body_column: Optional[str] = None  # longer text, returned as a snippet
+    key_column: Optional[str] = None  # public identifier returned with each hit, besides id
+
+
+SEARCH_INDEXES = {
+    "inventory": SearchIndex("inventory_items", "name", key_column="item_id"),
+    "recommendations": SearchIndex("recommendations", "title", "description"),
+    "signals": SearchIndex("intelligence_signals", "name", "impact_description")
+}
+
+TITLE_WEIGHT = 10.0
+SNIPPET_TOKENS = 16
+MAX_SEARCH_HITS = 100  # upper bound on limit, so one request never fetches a whole index
+
+# Control characters mark matches inside FTS output, so the text can be escaped before they become <mark>
+_OPEN, _CLOSE = "\x02", "\x03"
+
+
+def _fts_table(index: SearchIndex) -> str:
+    return f"{index.table}_fts"
+
+
+def _columns(index: SearchIndex) -> List[str]:
+    return [index.title_column] + ([index.body_column] if index.body_column else [])
+
+
+def fts5_available(conn) -> bool:
+    if conn.dialect.name != "sqlite":
+        return False
+    return bool(conn.exec_driver_sql("SELECT sqlite_compileoption_used('ENABLE_FTS5')").scalar())
+
+
+def create_search_indexes(conn):
+    """Create each FTS5 table and its sync triggers, and index the existing rows"""
+    for index in SEARCH_INDEXES.values():
+        fts, table = _fts_table(index), index.table
+        columns = ", ".join(_columns(index))
+        new_values = ", ".join(f"new.{column}" for column in _columns(index))
+        old_values = ", ".join(f"old.{column}" for column in _columns(index))
+        for statement in [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            # prefix: 2 and 3 character prefix indexes keep search-as-you-type queries cheap
+            f"{columns}, content='{table}', content_rowid='id', tokenize='porter unicode61', prefix='2 3')",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END",
+            # Only edits to the indexed columns touch the index (not e.g. seen_count refreshes)
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {columns} ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+            f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END",
+            f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"
+        ]:
+            conn.exec_driver_sql(statement)
+
+
+def drop_search_indexes(conn):
+    """Drop the FTS5 tables (their triggers go with the source tables)"""
+    if conn.dialect.name != "sqlite":
+        return
+    for index in SEARCH_INDEXES.values():
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {_fts_table(index)}")
+
+
+def _terms(query: str) -> List[str]:
+    return re.findall(r"\w+", query)
+
+
+def match_expression(terms: List[str]) -> str:
+    """FTS5 query matching every term, the last one as a prefix (search as you type)"""
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _markup(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    return html.escape(value).replace(_OPEN, "<mark>").replace(_CLOSE, "</mark>")
+
+
+def _fts_hits(db, name: str, terms: List[str], limit: int) -> List[Dict]:
+    index = SEARCH_INDEXES[name]
+    fts = _fts_table(index)
+    key = f"t.{index.key_column}" if index.key_column else "NULL"
+    snippet = f"snippet({fts}, 1, :open, :close, '…', {SNIPPET_TOKENS})" if index.body_column else "NULL"
+    rows = db.execute(text(
+        f"SELECT t.id, {key}, highlight({fts}, 0, :open, :close), {snippet}, bm25({fts}, {TITLE_WEIGHT}, 1.0) AS score "
+        f"FROM {fts} JOIN {index.table} t ON t.id = {fts}.rowid "
+        f"WHERE {fts} MATCH :match ORDER BY score LIMIT :limit"
+    ), {"open": _OPEN, "close": _CLOSE, "match": match_expression(terms), "limit": limit}).all()
+    return [
+        {"type": name, "id": row_id, "key": key_value, "title": _markup(title), "snippet": _markup(body), "score": score}
+        for row_id, key_value, title, body, score in rows
+    ]
+
+
+def _highlight(value: Optional[str], terms: List[str]) -> Optional[str]:
+    if value is None:
+        return None
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+    return _markup(pattern.sub(lambda match: f"{_OPEN}{match.group(0)}{_CLOSE}", value))
+
+
+def _like_hits(db, name: str, terms: List[str], limit: int) -> List[Dict]:
+    """Unranked substring search for databases without FTS5"""
+    index = SEARCH_INDEXES[name]
+    table = Base.metadata.tables[index.table]
+    columns = [table.c[column] for column in _columns(index)]
+    key = table.c[index.key_column] if index.key_column else None
+    stmt = select(table.c.id, *columns, *([key] if key is not None else [])).where(and_(*[
+        or_(*[column.icontains(term, autoescape=True) for column in columns]) for term in terms
+    ])).order_by(table.c.id.desc()).limit(limit)
+
+    hits = []
+    for row in db.execute(stmt).all():
+        hits.append({
+            "type": name,
+            "id": row.id,
+            "key": row[-1] if key is not None else None,
+            "title": _highlight(row[1], terms),
+            "snippet": _highlight(row[2], terms) if index.body_column else None,
+            "score": 0.0
+        })
+    return hits
+
+
+def search(db, q: str, types: Optional[str] = None, limit: int = 20) -> Dict:
+    """
+    Ranked full-text hits across the searchable tables
+
+    Args:
+        db: Session
+        q: Free text; every word must match, the last as a prefix
+        types: Comma-separated SEARCH_INDEXES keys (default: all)
+        limit: Maximum number of hits overall, at most MAX_SEARCH_HITS; 0 or less returns none
+
+    Returns:
+        dict: {"query", "hits": the best hit of each type, then the second best of each, ..., "duration_ms"}
+    """
+    started = time.perf_counter()
+    names = [name.strip() for name in (types or "").split(",") if name.strip()] or list(SEARCH_INDEXES)
+    unknown = [name for name in names if name not in SEARCH_INDEXES]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown search types: {', '.join(unknown)}; available: {', '.join(SEARCH_INDEXES)}"
+        )
+
+    terms = _terms(q)
+    limit = min(limit, MAX_SEARCH_HITS)
+    ranked = []  # each type's hits, best first
+    if terms and limit > 0:
+        use_fts = db.get_bind().dialect.name == "sqlite"
+        for name in names:
+            if use_fts:
+                try:
+                    ranked.append(_fts_hits(db, name, terms, limit))
+                    continue
+                except OperationalError:
+                    use_fts = False  # FTS tables not created (SQLite built without FTS5)
+            ranked.append(_like_hits(db, name, terms, limit))
+    # bm25 is only comparable within one FTS table, so take the types in turns
+    hits = [hit for rank in zip_longest(*ranked) for hit in rank if hit is not None][:limit]
+
+    return {
+        "query": q,
+        "hits": hits,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
@@ -1,21 +1,27 @@
 #!/usr/bin/env python3
 
 import os
-from database import engine, Base
+from database import engine
+from db_config import sqlite_database_path
 from populate_database import populate_database
+from migrations import apply_migrations, reset_schema
 
 def setup_database():
     """Setup and populate the database with initial data"""
     print("Setting up database...")
     
-    # Remove existing database file if it exists
-    db_file = "kopik.db"
-    if os.path.exists(db_file):
-        os.remove(db_file)
-        print(f"Removed existing database: {db_file}")
-    
-    # Create all tables
-    Base.metadata.create_all(bind=engine)
+    # Remove existing database file (and its WAL files) if it exists
+    db_file = sqlite_database_path()
+    if db_file:
+        engine.dispose()
+        for path in (db_file, f"{db_file}-wal", f"{db_file}-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+                print(f"Removed existing database: {path}")
+        apply_migrations(engine)
+    else:
+        reset_schema(engine)
+        print("Dropped existing tables")
     print("Created database tables")
     
     # Populate with data
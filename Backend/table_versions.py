@@ -0,0 +1,113 @@
+"""
+Table Change Versions for Kopik
+Every INSERT, UPDATE or DELETE that goes through a tracked engine bumps a
+per-table counter in the table_versions table, once per table per transaction
+and inside that same transaction. GET routes turn the counters into ETag and
+Last-Modified headers and answer a matching If-None-Match with 304 before any
+row is read, so a polling dashboard mostly costs one primary-key lookup
+
+Writes issued as raw SQL strings (text(), exec_driver_sql) are not tracked
+"""
+
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import DateTime, Integer, String, column, event, select, table
+
+TABLE_VERSIONS = "table_versions"
+
+# Execution option that turns tracking off for a connection (migrations run before the table exists)
+SKIP_TABLE_VERSIONS = "skip_table_versions"
+
+_BUMPED = "table_versions_bumped"  # connection.info: tables already bumped in the current transaction
+
+# Core view of database.TableVersion, which cannot be imported here (database.py imports this module)
+_versions = table(TABLE_VERSIONS, column("table_name", String), column("version", Integer), column("changed_at", DateTime))
+
+
+def _bump(conn, name: str):
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    now = datetime.utcnow()
+    stmt = insert(_versions).values(table_name=name, version=1, changed_at=now)
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=["table_name"],
+        set_={"version": _versions.c.version + 1, "changed_at": now}
+    ))
+
+
+def _forget_bumps(conn, *args):
+    conn.info.pop(_BUMPED, None)
+
+
+def _after_execute(conn, clauseelement, multiparams, params, execution_options, result):
+    if not getattr(clauseelement, "is_dml", False) or conn.get_execution_options().get(SKIP_TABLE_VERSIONS):
+        return
+    name = getattr(getattr(clauseelement, "table", None), "name", None)
+    if name is None or name == TABLE_VERSIONS:
+        return
+    bumped = conn.info.setdefault(_BUMPED, set())
+    if name not in bumped:
+        bumped.add(name)
+        _bump(conn, name)
+
+
+def track_table_versions(engine):
+    """Bump table versions for every write executed through engine (a sync Engine)"""
+    event.listen(engine, "after_execute", _after_execute)
+    event.listen(engine, "begin", _forget_bumps)
+    # The bump may have been inside the savepoint; bump again on the next write
+    event.listen(engine, "rollback_savepoint", _forget_bumps)
+
+
+def read_versions(db, tables: Iterable[str]) -> Dict[str, Tuple[int, Optional[datetime]]]:
+    """(version, changed_at) per table; tables never written are (0, None)"""
+    tables = list(tables)
+    rows = db.execute(select(_versions.c.table_name, _versions.c.version, _versions.c.changed_at).where(
+        _versions.c.table_name.in_(tables)
+    )).all()
+    found = {name: (version, changed_at) for name, version, changed_at in rows}
+    return {name: found.get(name, (0, None)) for name in tables}
+
+
+def make_etag(versions: Dict[str, Tuple[int, Optional[datetime]]]) -> str:
+    # Weak: the fast JSON path may encode the same rows byte-differently
+    return 'W/"' + "+".join(f"{name}.{version}" for name, (version, _) in versions.items()) + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison against an If-None-Match header value"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in [candidate.removeprefix("W/") for candidate in candidates]
+
+
+def versioned(*tables: str):
+    """
+    Route dependency for conditional GETs on data read from tables
+
+    Sets ETag, Last-Modified and Cache-Control: no-cache (browsers then revalidate
+    with If-None-Match on their own), and raises a 304 when the client's copy is
+    current so the route body never runs. The lookup runs on the selected API
+    stack (an AsyncSession on the async stack), like the routes themselves.
+    """
+    from api_stack import run_db
+
+    async def check_versions(request: Request, response: Response):
+        versions = await run_db(read_versions, tables)
+        etag = make_etag(versions)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        changed = [changed_at for _, changed_at in versions.values() if changed_at]
+        if changed:
+            headers["Last-Modified"] = format_datetime(max(changed).replace(tzinfo=timezone.utc), usegmt=True)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+
+    return Depends(check_versions)
@@ -121,9 +121,9 @@ def test_individual_llm_services():
 
         test_data = {
             "inventory": [],
-            "food_waste": [],
+            "food_waste": {},
             "events": [],
-            "sales": [],
+            "sales": {},
             "orders": [],
             "weather": []
         }
@@ -142,9 +142,9 @@ def test_individual_llm_services():
 
         test_data = {
             "inventory": [],
-            "food_waste": [],
+            "food_waste": {},
             "events": [],
-            "sales": [],
+            "sales": {},
             "orders": [],
             "weather": []
         }
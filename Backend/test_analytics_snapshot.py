@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Analytics snapshot tests for Kopik
+The agent's sales and waste aggregates agree whether they read the columnar
+snapshot or the running totals, and a refresh picks up a row that committed
+below an id it had already loaded
+
+Run with pytest: python -m pytest test_analytics_snapshot.py
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import analytics_snapshot
+from agents.enhanced_agent import aggregate_food_waste, aggregate_sales
+from database import SessionLocal, FoodWaste, InventoryItem, Sale
+from running_aggregates import record_food_waste, record_sale
+
+
+def _add_sale(db, item_id, time_of_day, customer_type, amount, days_ago=0, sale_id=None):
+    sale = Sale(id=sale_id, sale_date=date.today() - timedelta(days=days_ago), item_id=item_id, quantity_sold=1.0,
+                unit_price=amount, total_amount=amount, time_of_day=time_of_day, customer_type=customer_type)
+    db.add(sale)
+    record_sale(db, sale)
+    db.commit()
+
+
+def _add_waste(db, item_id, reason, cost):
+    waste = FoodWaste(item_id=item_id, waste_date=date.today(), quantity_wasted=1.0, unit="each",
+                      reason=reason, cost_impact=cost)
+    db.add(waste)
+    record_food_waste(db, waste)
+    db.commit()
+
+
+@pytest.fixture
+def db(scratch_db, analytics_snapshot_dir):
+    session = SessionLocal()
+    session.add_all([
+        InventoryItem(item_id="MILK001", name="Whole Milk", category="Dairy", current_stock=2.0, unit="gallons",
+                      daily_usage=3.0, cost_per_unit=4.0),
+        InventoryItem(item_id="BEAN001", name="Espresso Beans", category="Beverages", current_stock=40.0, unit="lbs",
+                      daily_usage=4.0, cost_per_unit=12.0)
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_aggregates_match_the_running_totals(db):
+    week_ago = date.today() - timedelta(days=7)
+    _add_sale(db, "MILK001", "morning", "regular", 4.5)
+    _add_sale(db, "MILK001", None, "", 4.5)
+    _add_sale(db, "BEAN001", "", None, 9.0)
+    _add_sale(db, "BEAN001", "evening", "tourist", 9.0, days_ago=20)  # outside the week
+    _add_waste(db, "MILK001", "expired", 4.0)
+    from_totals = aggregate_sales(db, week_ago), aggregate_food_waste(db, week_ago)
+
+    for name in analytics_snapshot.SNAPSHOT_TABLES:
+        analytics_snapshot.refresh(name)
+    assert analytics_snapshot.current_group_totals(db, "sales", ["item"], week_ago) is not None
+    assert (aggregate_sales(db, week_ago), aggregate_food_waste(db, week_ago)) == from_totals
+
+    # Rows written after the refresh are read from the table until the next one
+    _add_sale(db, "MILK001", "morning", "regular", 4.5)
+    _add_waste(db, "BEAN001", "damaged", 12.0)
+    sales = aggregate_sales(db, week_ago)
+    waste = aggregate_food_waste(db, week_ago)
+    assert sales["by_item"]["MILK001"] == {"transactions": 3, "quantity": 3.0, "revenue": 13.5}
+    assert sales["by_time_of_day"]["unknown"]["transactions"] == 2
+    assert waste["by_reason"]["damaged"] == {"records": 1, "cost": 12.0}
+    assert waste["total_cost"] == 16.0
+
+
+def test_refresh_picks_up_a_lower_id_committed_late(db):
+    _add_sale(db, "MILK001", "morning", "regular", 4.5, sale_id=1)
+    _add_sale(db, "MILK001", "morning", "regular", 4.5, sale_id=3)
+    assert analytics_snapshot.refresh("sales")["appended"] == 2
+
+    # Id 2 was handed out before id 3 but committed after the refresh loaded id 3
+    _add_sale(db, "BEAN001", "evening", "regular", 9.0, sale_id=2)
+    assert analytics_snapshot.refresh("sales")["appended"] == 1
+    assert analytics_snapshot.refresh("sales")["appended"] == 0
+
+    snapshot = analytics_snapshot.load("sales")
+    assert sorted(snapshot["id"].tolist()) == [1, 2, 3]
+    assert analytics_snapshot.totals_by_item(snapshot, "amount") == {"MILK001": 9.0, "BEAN001": 9.0}
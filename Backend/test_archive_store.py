@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Archive regression tests for Kopik
+Archives rows across a table that empties between runs and checks that a freed
+id is never handed out again, so no archived row is overwritten or hidden
+
+Run with pytest: python -m pytest test_archive_store.py
+"""
+
+import os
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import MetaData, create_engine, text
+
+import archive_store
+from migrations import apply_migrations
+from database import Base, SessionLocal, InventoryItem, Recommendation, Sale
+
+
+def _add_recommendation(title):
+    db = SessionLocal()
+    try:
+        seen = datetime.utcnow() - timedelta(days=30)
+        rec = Recommendation(priority="high", title=title, description=title, confidence=80.0,
+                             category="inventory", fingerprint=title, first_seen_at=seen, last_seen_at=seen)
+        db.add(rec)
+        db.commit()
+        return rec.id
+    finally:
+        db.close()
+
+
+def _archived_titles():
+    month = (datetime.utcnow() - timedelta(days=30)).strftime("%Y-%m")
+    return {row["id"]: row["title"] for row in archive_store.read_partition("recommendations", month)}
+
+
+def test_archiving_an_emptied_table_twice_keeps_both_rows(scratch_db, archive_dir):
+    from recommendation_store import run_compaction
+
+    first = _add_recommendation("Reorder milk")
+    run_compaction(retention_days=0)
+    second = _add_recommendation("Reorder beans")
+    assert second != first, "an id freed by archival was reused"
+    run_compaction(retention_days=0)
+
+    assert _archived_titles() == {first: "Reorder milk", second: "Reorder beans"}
+
+    # A new hot row does not hide an archived one
+    third = _add_recommendation("Reorder cups")
+    db = SessionLocal()
+    try:
+        hot = db.query(Recommendation).all()
+        rows = archive_store.include_archived(hot, "recommendations", date.today() - timedelta(days=60))
+        ids = sorted(row["id"] if isinstance(row, dict) else row.id for row in rows)
+        assert ids == sorted([first, second, third])
+    finally:
+        db.close()
+
+
+def test_migration_starts_ids_above_the_archive(archive_dir, tmp_path):
+    archive_store._write_partition("sales", "2020-01", [{"id": 9, "sale_date": "2020-01-05", "item_id": "MILK001"}])
+
+    # A database created before the archived tables had AUTOINCREMENT
+    legacy = MetaData()
+    for table in Base.metadata.sorted_tables:
+        table.to_metadata(legacy).dialect_options["sqlite"]["autoincrement"] = False
+    legacy_engine = create_engine(f"sqlite:///{os.path.join(tmp_path, 'legacy.db')}")
+    legacy.create_all(legacy_engine)
+    with legacy_engine.begin() as conn:
+        conn.execute(InventoryItem.__table__.insert().values(
+            item_id="MILK001", name="Whole Milk", category="Dairy", current_stock=2.0, unit="gallons",
+            daily_usage=3.0, cost_per_unit=4.0))
+        conn.execute(Sale.__table__.insert().values(
+            id=5, sale_date=date.today(), item_id="MILK001", quantity_sold=1.0, unit_price=4.5, total_amount=4.5))
+
+    apply_migrations(legacy_engine)
+
+    with legacy_engine.begin() as conn:
+        sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE name = 'sales'")).scalar()
+        assert "AUTOINCREMENT" in sql.upper()
+        assert conn.execute(text("SELECT id FROM sales")).scalars().all() == [5]
+        new_id = conn.execute(Sale.__table__.insert().values(
+            sale_date=date.today(), item_id="MILK001", quantity_sold=1.0, unit_price=4.5, total_amount=4.5
+        )).inserted_primary_key[0]
+    legacy_engine.dispose()
+    assert new_id == 10, f"new sale got id {new_id}, at or below the archived id 9"
+
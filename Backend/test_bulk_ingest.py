@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Bulk ingestion tests for Kopik
+An atomic batch with a bad row is rejected with a 422 and writes nothing, a
+non-atomic one keeps its good rows, and the single-row and bulk routes agree
+on rows that reference unknown inventory items
+
+Run with pytest: python -m pytest test_bulk_ingest.py
+"""
+
+from datetime import date
+
+import pytest
+
+from database import SessionLocal, InventoryItem, Sale
+
+
+@pytest.fixture
+def client(scratch_db, archive_dir):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    db = SessionLocal()
+    try:
+        db.add(InventoryItem(item_id="MILK001", name="Whole Milk", category="Dairy", current_stock=2.0,
+                             unit="gallons", daily_usage=3.0, cost_per_unit=4.0))
+        db.commit()
+    finally:
+        db.close()
+    return TestClient(app)
+
+
+def _sale(item_id):
+    return {"sale_date": date.today().isoformat(), "item_id": item_id, "quantity_sold": 1,
+            "unit_price": 4.5, "total_amount": 4.5}
+
+
+def _stored_sales():
+    db = SessionLocal()
+    try:
+        return db.query(Sale).count()
+    finally:
+        db.close()
+
+
+def test_atomic_batch_with_a_bad_row_is_rejected(client):
+    batch = [_sale("MILK001"), _sale("NOPE001"), {"item_id": "MILK001"}]
+
+    response = client.post("/api/sales/bulk?atomic=true", json=batch)
+    assert response.status_code == 422, response.text
+    body = response.json()
+    assert body["inserted"] == 0 and body["failed"] == 2
+    assert [error["row"] for error in body["errors"]] == [1, 2]
+    assert _stored_sales() == 0
+
+    response = client.post("/api/sales/bulk", json=batch)
+    assert response.status_code == 200 and response.json()["inserted"] == 1
+    assert _stored_sales() == 1
+
+
+def test_single_row_and_bulk_agree_on_unknown_items(client):
+    response = client.post("/api/sales/", json=_sale("NOPE001"))
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "item_id"]
+
+    response = client.post("/api/food-waste/", json={
+        "item_id": "NOPE001", "waste_date": date.today().isoformat(), "quantity_wasted": 1,
+        "unit": "gallons", "reason": "expired", "cost_impact": 4.0
+    })
+    assert response.status_code == 422
+
+    assert client.post("/api/sales/", json=_sale("MILK001")).status_code == 200
+    assert _stored_sales() == 1
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Query plan regression tests for Kopik
+Records every SQL statement issued by the API routes and the analyzers against a
+scratch SQLite database, runs EXPLAIN QUERY PLAN on each, and fails when one of
+them falls back to a full table scan
+
+Run with pytest: python -m pytest test_query_plans.py
+"""
+
+import re
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event
+
+from database import (
+    SessionLocal, engine, snapshot_engine, InventoryItem, IntelligenceSignal, Recommendation,
+    FoodWaste, Weather, Event, Sale, Order
+)
+
+
+def seed():
+    """A few rows per table so every route has something to return"""
+    db = SessionLocal()
+    today = date.today()
+    try:
+        db.add_all([
+            InventoryItem(item_id="MILK001", name="Whole Milk", category="Dairy", current_stock=2.0, unit="gallons",
+                          reorder_point=5.0, daily_usage=3.0, cost_per_unit=4.0, supplier="Local Dairy"),
+            InventoryItem(item_id="BEAN001", name="Espresso Beans", category="Beverages", current_stock=40.0, unit="lbs",
+                          reorder_point=10.0, daily_usage=4.0, cost_per_unit=12.0, supplier="Roasters")
+        ])
+        db.add(IntelligenceSignal(name="Heat wave", category="Environment", impact_description="Iced drinks up"))
+        db.add(Recommendation(priority="high", title="Reorder milk", description="Reorder 20 gallons of milk",
+                              confidence=90.0, category="inventory", fingerprint="seed-1",
+                              first_seen_at=datetime.utcnow(), last_seen_at=datetime.utcnow()))
+        db.add(FoodWaste(item_id="MILK001", waste_date=today, quantity_wasted=1.0, unit="gallons",
+                         reason="expired", cost_impact=4.0))
+        db.add(Weather(date=today, temperature_high=90.0, temperature_low=70.0, condition="sunny"))
+        db.add(Event(name="Street fair", event_type="festival", start_date=today + timedelta(days=2)))
+        db.add(Sale(sale_date=today, item_id="BEAN001", quantity_sold=2.0, unit_price=4.5, total_amount=9.0))
+        db.add(Order(order_date=today, item_id="MILK001", supplier="Local Dairy", quantity_ordered=10.0,
+                     unit_cost=4.0, total_cost=40.0, status="pending"))
+        db.commit()
+    finally:
+        db.close()
+
+    from running_aggregates import rebuild_running_aggregates
+    rebuild_running_aggregates()
+
+
+def record_statements(workload):
+    """Run workload and return the distinct (statement, parameters) it executed"""
+    statements = {}
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if executemany or statement.lstrip().split(None, 1)[0].upper() not in ("SELECT", "UPDATE", "DELETE"):
+            return
+        statements.setdefault(statement, parameters)
+
+    engines = [engine]
+    if snapshot_engine is not engine:
+        engines.append(snapshot_engine)  # the analysis reads
+    try:
+        from async_database import async_engine
+        engines.append(async_engine.sync_engine)  # the async route stack
+    except ImportError:
+        pass
+
+    for target in engines:
+        event.listen(target, "before_cursor_execute", capture)
+    try:
+        workload()
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", capture)
+    return statements
+
+
+def exercise_routes():
+    """Every CRUD route, reads and writes"""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+    today = date.today().isoformat()
+
+    for path in [
+        "/api/intelligence-signals/", "/api/intelligence-signals/1",
+        "/api/inventory-items/", "/api/inventory-items/MILK001", "/api/inventory-items/low-stock/",
+        "/api/inventory-items/?category=Dairy", "/api/inventory-items/?supplier=Roasters",
+        "/api/inventory-items/?below_reorder=true", "/api/inventory-items/?min_stock_ratio=1&max_stock_ratio=5",
+        "/api/inventory-items/?q=whole", "/api/inventory-items/?category=Dairy&sort=-stock_ratio,name",
+        "/api/recommendations/", "/api/recommendations/1", "/api/recommendations/high-priority/",
+        "/api/recommendations/?priority=high", "/api/recommendations/?category=inventory",
+        "/api/recommendations/?priority=high&category=inventory",
+        "/api/food-waste/", "/api/food-waste/recent/",
+        "/api/weather/", "/api/weather/current/",
+        "/api/events/", "/api/events/upcoming/",
+        "/api/sales/", "/api/sales/recent/", "/api/sales/by-item/BEAN001",
+        "/api/sales/daily/", "/api/sales/daily/?item_id=BEAN001",
+        "/api/orders/", "/api/orders/pending/", "/api/orders/1",
+        "/api/search?q=milk", "/api/search?q=iced+dri&types=signals,recommendations"
+    ]:
+        response = client.get(path)
+        assert response.status_code == 200, f"GET {path} -> {response.status_code}"
+
+    # Keyset pages: follow X-Next-Cursor so the range predicates are planned too
+    for path in [
+        "/api/intelligence-signals/", "/api/inventory-items/", "/api/recommendations/",
+        "/api/recommendations/?priority=high&category=inventory", "/api/food-waste/",
+        "/api/weather/", "/api/events/", "/api/sales/", "/api/orders/"
+    ]:
+        separator = "&" if "?" in path else "?"
+        response = client.get(f"{path}{separator}limit=1")
+        while "X-Next-Cursor" in response.headers:
+            response = client.get(f"{path}{separator}limit=1&cursor={response.headers['X-Next-Cursor']}")
+            assert response.status_code == 200, f"GET {path} page -> {response.status_code}"
+
+    # An empty or negative page is empty, not an error
+    for path in ["/api/sales/", "/api/inventory-items/", "/api/inventory-items/?sort=name", "/api/recommendations/"]:
+        for limit in (0, -1):
+            response = client.get(f"{path}{'&' if '?' in path else '?'}limit={limit}")
+            assert response.status_code == 200 and response.json() == [], f"GET {path} limit={limit} -> {response.status_code}"
+    for limit in (0, -1):
+        response = client.get(f"/api/search?q=milk&limit={limit}")
+        assert response.status_code == 200 and response.json()["hits"] == [], f"GET /api/search limit={limit} -> {response.status_code}"
+
+    writes = [
+        ("post", "/api/sales/", {"sale_date": today, "item_id": "MILK001", "quantity_sold": 1,
+                                 "unit_price": 4.5, "total_amount": 4.5}),
+        ("post", "/api/food-waste/", {"item_id": "BEAN001", "waste_date": today, "quantity_wasted": 1,
+                                      "unit": "lbs", "reason": "damaged", "cost_impact": 12.0}),
+        ("post", "/api/recommendations/", {"priority": "medium", "title": "Promote iced drinks",
+                                           "description": "Promote iced drinks during the heat wave",
+                                           "confidence": 75.0, "category": "weather"}),
+        ("post", "/api/sales/bulk", [{"sale_date": today, "item_id": "BEAN001", "quantity_sold": 2,
+                                      "unit_price": 4.5, "total_amount": 9.0}]),
+        ("post", "/api/food-waste/bulk", [{"item_id": "MILK001", "waste_date": today, "quantity_wasted": 1,
+                                           "unit": "gallons", "reason": "expired", "cost_impact": 4.0}]),
+        ("put", "/api/orders/1", {"status": "delivered"}),
+        ("put", "/api/inventory-items/BEAN001", {"current_stock": 35.0})
+    ]
+    for method, path, body in writes:
+        response = getattr(client, method)(path, json=body)
+        assert response.status_code == 200, f"{method.upper()} {path} -> {response.status_code}"
+
+    # Without a cursor each list keeps the order it had before keyset pagination
+    waste_ids = [row["id"] for row in client.get("/api/food-waste/").json()]
+    assert len(waste_ids) > 1 and waste_ids == sorted(waste_ids), f"food waste not in id order: {waste_ids}"
+    sale_dates = [row["sale_date"] for row in client.get("/api/sales/").json()]
+    assert sale_dates == sorted(sale_dates, reverse=True), f"sales not newest first: {sale_dates}"
+
+
+def exercise_analyzers():
+    """The data fetch and analyzers behind the dashboard, plus the maintenance jobs"""
+    import analytics_snapshot
+    from analysis_engine import AnalysisEngine
+    from recommendation_store import run_compaction
+    from archive_store import run_archival
+    from running_aggregates import expire_old_totals
+
+    AnalysisEngine().prepare_dashboard()
+    if analytics_snapshot.np is not None:
+        # Refresh twice: the second reads the id overlap window, then the aggregates read snapshot + newer rows
+        for _ in range(2):
+            for name in analytics_snapshot.SNAPSHOT_TABLES:
+                analytics_snapshot.refresh(name)
+        AnalysisEngine().prepare_dashboard()
+    run_compaction()
+    run_archival()
+
+    db = SessionLocal()
+    try:
+        expire_old_totals(db, force=True)
+        db.commit()
+    finally:
+        db.close()
+
+
+def full_scans(statements):
+    """Statements whose plan reads a whole table without an index"""
+    offenders = []
+    with engine.connect() as conn:
+        for statement, parameters in statements.items():
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+            details = [row[-1] for row in plan]
+            scans = [
+                d for d in details
+                if d.startswith("SCAN") and "USING" not in d and "CONSTANT ROW" not in d
+                and not re.search(r"VIRTUAL TABLE INDEX \d+:M", d)  # an FTS5 MATCH is an index lookup
+            ]
+            if not scans:
+                continue
+            normalized = " ".join(statement.upper().split())
+            # A bare page of a listing (no filter, LIMIT-bounded) is a scan by nature, as long as
+            # it walks the table in page order instead of sorting it
+            sorts = any("TEMP B-TREE" in d for d in details)
+            if " WHERE " not in normalized and " LIMIT " in normalized and not sorts:
+                continue
+            offenders.append((" ".join(statement.split()), details))
+    return offenders
+
+
+def _assert_no_full_scans(statements):
+    offenders = full_scans(statements)
+    message = "\n".join(f"{sql}\n    -> {plan}" for sql, plan in offenders)
+    assert not offenders, f"{len(offenders)} queries fall back to a full table scan:\n{message}"
+
+
+def test_route_queries_use_indexes(scratch_db, archive_dir):
+    seed()
+    statements = record_statements(exercise_routes)
+    assert statements, "no statements were recorded"
+    _assert_no_full_scans(statements)
+
+
+def test_analyzer_queries_use_indexes(scratch_db, archive_dir, analytics_snapshot_dir):
+    seed()
+    statements = record_statements(exercise_analyzers)
+    assert statements, "no statements were recorded"
+    _assert_no_full_scans(statements)
+
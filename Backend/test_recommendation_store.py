@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Recommendation fingerprint tests for Kopik
+Amounts that change between analysis runs are masked; identifiers are not
+
+Run with pytest: python -m pytest test_recommendation_store.py
+"""
+
+from recommendation_store import recommendation_fingerprint
+
+SAME = [
+    ("Increase inventory by 40% for iced drinks", "Increase inventory by 45% for iced drinks"),
+    ("Reorder 20 gallons of milk", "Reorder 25.5 gallons of milk"),
+    ("Cut waste worth $1,200.50 on pastries", "Cut waste worth $90 on pastries"),
+    ("Stock up before the 92°F heat wave", "Stock up before the 85°F heat wave"),
+    ("Order 3 cases of MILK001", "Order 5 cases of MILK001")
+]
+
+DIFFERENT = [
+    ("Reorder item 0 before Friday", "Reorder item 1 before Friday"),
+    ("Promote BEAN001 this week", "Promote BEAN002 this week"),
+    ("Order 3 cases of MILK001", "Order 3 cases of MILK002"),
+    ("Reorder 20 gallons of milk", "Reorder 20 lbs of milk")
+]
+
+
+def test_amounts_are_masked():
+    for first, second in SAME:
+        assert recommendation_fingerprint("inventory", first) == recommendation_fingerprint("inventory", second), \
+            f"{first!r} and {second!r} should be one recommendation"
+
+
+def test_identifiers_are_kept():
+    for first, second in DIFFERENT:
+        assert recommendation_fingerprint("inventory", first) != recommendation_fingerprint("inventory", second), \
+            f"{first!r} and {second!r} should be two recommendations"
+
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Running aggregate tests for Kopik
+A rebuild of the daily sales rollup produces the same keys as the write path
+
+Run with pytest: python -m pytest test_running_aggregates.py
+"""
+
+from datetime import date
+
+from database import SessionLocal, DailySalesRollup, InventoryItem, Sale
+from running_aggregates import rebuild_running_aggregates, record_sale
+
+
+def _rollup(db):
+    return sorted(
+        (row.item_id, row.time_of_day, row.customer_type, row.transactions, row.revenue)
+        for row in db.query(DailySalesRollup)
+    )
+
+
+def test_rebuild_matches_write_path(scratch_db):
+    db = SessionLocal()
+    try:
+        db.add(InventoryItem(item_id="MILK001", name="Whole Milk", category="Dairy", current_stock=2.0,
+                             unit="gallons", daily_usage=3.0, cost_per_unit=4.0))
+        db.flush()
+        today = date.today()
+        for time_of_day, customer_type in [(None, None), ("", ""), ("morning", "regular")]:
+            sale = Sale(sale_date=today, item_id="MILK001", quantity_sold=1.0, unit_price=4.5, total_amount=4.5,
+                        time_of_day=time_of_day, customer_type=customer_type)
+            db.add(sale)
+            record_sale(db, sale)
+        db.commit()
+        written = _rollup(db)
+
+        rebuild_running_aggregates(db)
+        assert _rollup(db) == written
+        assert ("MILK001", "unknown", "unknown", 2, 9.0) in written
+    finally:
+        db.close()
+